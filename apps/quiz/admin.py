@@ -1,3 +1,237 @@
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
 
-# Register your models here.
+from utlis.admin import ScalableAdminMixin
+from .models import (
+    Category, Quiz, Question, Option, Submission, SubmissionAnswer, ArchivedSubmissionAnswer, PurgeJob,
+    AnswerEvent, UserCategoryStats, ActivityRollup, RollupWatermark
+)
+from .services import QuestionService, QuizService, RegradeService, UserStatsService
+
+# A changelist reads the relations its list_display touches: a foreign key column renders
+# that object's __str__ and a callable reads whatever it follows; plain *_id columns need no
+# join. On Django 5.0+ the action checkbox's aria-label also renders each row's own __str__,
+# so admins with actions (every admin here) need its relations as well. list_select_related
+# covers exactly those, or the page blows its query budget or pays for unused joins.
+
+
+@admin.register(Category)
+class CategoryAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ['id', 'name', 'is_deleted', 'created_at']
+    list_filter = ['is_deleted']
+    search_fields = ['name__exact']
+
+
+@admin.register(Quiz)
+class QuizAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ['id', 'title', 'category', 'created_by', 'version', 'is_active', 'is_deleted', 'created_at']
+    list_select_related = ['category', 'created_by']
+    list_filter = ['is_active', 'is_deleted']
+    search_fields = ['title__startswith']
+    raw_id_fields = ['category', 'created_by', 'parent']
+    actions = ['activate_quizzes', 'deactivate_quizzes', 'regrade_quizzes', 'clone_quizzes']
+
+    def _split_by_rows(self, queryset, count_rows):
+        """Quiz ids whose rows fit together in ADMIN_ACTION_ROW_LIMIT, and the ones left for a command"""
+        budget = settings.ADMIN_ACTION_ROW_LIMIT
+        now, later = [], []
+        for quiz_id in queryset.order_by('id').values_list('id', flat=True):
+            # Capped counts, so sizing a huge quiz costs no more than the limit
+            rows = count_rows(quiz_id, budget + 1)
+            if rows <= budget:
+                now.append(quiz_id)
+                budget -= rows
+            else:
+                later.append(quiz_id)
+        return now, later
+
+    def _report_skipped(self, request, quiz_ids, command):
+        if quiz_ids:
+            self.message_user(
+                request,
+                f"Quizzes {', '.join(map(str, quiz_ids))} are too large to handle in the admin; "
+                f"run `python manage.py {command} --quiz <id>` for each",
+                messages.WARNING
+            )
+
+    def _invalidate_question_ids(self, queryset):
+        quizzes = list(queryset.values_list('id', 'category_id'))
+        QuestionService.invalidate_question_ids(
+            quiz_ids=[quiz_id for quiz_id, _ in quizzes],
+            category_ids={category_id for _, category_id in quizzes}
+        )
+
+    @admin.action(description="Activate selected quizzes")
+    def activate_quizzes(self, request, queryset):
+        updated = queryset.filter(is_deleted=False).update(is_active=True)
+        self._invalidate_question_ids(queryset)
+        self.message_user(request, f"{updated} quizzes activated", messages.SUCCESS)
+
+    @admin.action(description="Deactivate selected quizzes")
+    def deactivate_quizzes(self, request, queryset):
+        updated = queryset.update(is_active=False)
+        self._invalidate_question_ids(queryset)
+        self.message_user(request, f"{updated} quizzes deactivated", messages.SUCCESS)
+
+    @admin.action(description="Regrade submissions for selected quizzes")
+    def regrade_quizzes(self, request, queryset):
+        def count_answers(quiz_id, cap):
+            return sum(
+                model.objects.filter(submission__quiz_id=quiz_id)[:cap].count()
+                for model in (SubmissionAnswer, ArchivedSubmissionAnswer)
+            )
+
+        quiz_ids, skipped = self._split_by_rows(queryset, count_answers)
+        changed = submissions = 0
+        for quiz_id in quiz_ids:
+            result = RegradeService.regrade(quiz_id=quiz_id)
+            changed += result['answers_changed']
+            submissions += result['submissions_updated']
+        self.message_user(request, f"{changed} answers regraded, {submissions} submissions updated", messages.SUCCESS)
+        self._report_skipped(request, skipped, 'regrade')
+
+    @admin.action(description="Clone selected quizzes as new inactive versions")
+    def clone_quizzes(self, request, queryset):
+        quiz_ids, skipped = self._split_by_rows(
+            queryset, lambda quiz_id, cap: Option.objects.filter(question__quiz_id=quiz_id)[:cap].count()
+        )
+        clones = [QuizService.clone_quiz(quiz_id, request.user) for quiz_id in quiz_ids]
+        self.message_user(request, f"{len(clones)} quizzes cloned", messages.SUCCESS)
+        self._report_skipped(request, skipped, 'clone_quiz')
+
+
+@admin.register(Question)
+class QuestionAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ['id', 'quiz_title', 'short_text', 'created_at']
+    list_select_related = ['quiz']
+    raw_id_fields = ['quiz']
+
+    # Adding, moving or deleting questions changes the banks random draws are taken from
+    def _invalidate_question_ids(self, quiz_ids):
+        QuestionService.invalidate_question_ids(
+            quiz_ids=quiz_ids,
+            category_ids=set(Quiz.objects.filter(id__in=quiz_ids).values_list('category_id', flat=True))
+        )
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        quiz_ids = {obj.quiz_id}
+        if change and form.initial.get('quiz'):
+            # The quiz it was moved away from
+            quiz_ids.add(form.initial['quiz'])
+        self._invalidate_question_ids(quiz_ids)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self._invalidate_question_ids([obj.quiz_id])
+
+    def delete_queryset(self, request, queryset):
+        quiz_ids = set(queryset.values_list('quiz_id', flat=True))
+        super().delete_queryset(request, queryset)
+        self._invalidate_question_ids(quiz_ids)
+
+    @admin.display(description="Quiz", ordering='quiz__title')
+    def quiz_title(self, obj):
+        return obj.quiz.title
+
+    @admin.display(description="Text")
+    def short_text(self, obj):
+        return obj.text[:80]
+
+
+@admin.register(Option)
+class OptionAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ['id', 'question_id', 'text', 'is_correct']
+    list_select_related = ['question']
+    raw_id_fields = ['question']
+
+
+@admin.register(Submission)
+class SubmissionAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ['id', 'username', 'quiz_title', 'attempted_count', 'correct_count', 'is_completed', 'updated_at']
+    list_select_related = ['user', 'quiz']
+    list_filter = ['is_completed']
+    search_fields = ['user__username__exact']
+    raw_id_fields = ['user', 'quiz']
+
+    @admin.display(description="User", ordering='user__username')
+    def username(self, obj):
+        return obj.user.username
+
+    @admin.display(description="Quiz", ordering='quiz__title')
+    def quiz_title(self, obj):
+        return obj.quiz.title
+
+
+@admin.register(SubmissionAnswer)
+class SubmissionAnswerAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ['id', 'submission_id', 'username', 'question_id', 'selected_option_id', 'is_correct', 'created_at']
+    list_select_related = ['submission__user', 'question']
+    search_fields = ['submission__user__username__exact']
+    raw_id_fields = ['submission', 'question', 'selected_option']
+
+    @admin.display(description="User")
+    def username(self, obj):
+        return obj.submission.user.username
+
+
+@admin.register(ArchivedSubmissionAnswer)
+class ArchivedSubmissionAnswerAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ['id', 'submission_id', 'question_id', 'selected_option_id', 'is_correct', 'archived_at']
+    # For __str__ in the action checkbox label, nothing in list_display needs them
+    list_select_related = ['submission__user', 'question']
+    raw_id_fields = ['submission', 'question', 'selected_option']
+
+
+@admin.register(PurgeJob)
+class PurgeJobAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ['id', 'target', 'target_id', 'status', 'created_by', 'created_at', 'updated_at']
+    list_select_related = ['created_by']
+    list_filter = ['status']
+    readonly_fields = ['deleted_counts', 'error']
+    raw_id_fields = ['created_by']
+
+
+@admin.register(AnswerEvent)
+class AnswerEventAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ['id', 'submission_id', 'user_id', 'quiz_id', 'question_id', 'option_id', 'is_correct', 'created_at']
+    search_fields = ['submission_id__exact']
+
+    # The log is append-only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(UserCategoryStats)
+class UserCategoryStatsAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ['id', 'user', 'category', 'quizzes_started', 'quizzes_completed', 'questions_attempted',
+                    'correct_answers', 'longest_streak', 'last_activity_date']
+    list_select_related = ['user', 'category']
+    search_fields = ['user__username__exact']
+    raw_id_fields = ['user', 'category']
+    actions = ['rebuild_stats']
+
+    @admin.action(description="Rebuild stats for the selected rows' users")
+    def rebuild_stats(self, request, queryset):
+        user_ids = sorted(set(queryset.values_list('user_id', flat=True)))
+        UserStatsService.rebuild_users(user_ids)
+        self.message_user(request, f"Rebuilt stats for {len(user_ids)} users", messages.SUCCESS)
+
+
+@admin.register(ActivityRollup)
+class ActivityRollupAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ['id', 'period', 'bucket_start', 'category_id', 'quiz_id', 'attempts', 'correct_answers',
+                    'completions', 'active_users']
+    list_filter = ['period']
+    search_fields = ['category_id__exact', 'quiz_id__exact']
+
+
+@admin.register(RollupWatermark)
+class RollupWatermarkAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ['period', 'processed_until', 'updated_at']
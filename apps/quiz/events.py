@@ -0,0 +1,143 @@
+import asyncio
+import json
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.utils.module_loading import import_string
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+STREAM_TOKEN_SALT = 'submission-stream'
+
+
+def encode_event(event_type, data):
+    """Encode a payload once as an SSE frame so every subscriber shares the same bytes"""
+    return f"event: {event_type}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+class Subscription:
+    def __init__(self, loop, max_queued):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_queued)
+
+    def put(self, payload):
+        # A dashboard that can't keep up skips its oldest events instead of growing without bound
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(payload)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class InProcessBroker:
+    """Fan events out to the dashboard streams connected to this process"""
+
+    def __init__(self, max_queued=100):
+        self.max_queued = max_queued
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        subscription = Subscription(asyncio.get_running_loop(), self.max_queued)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, payload):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, payload)
+            except RuntimeError:
+                self.unsubscribe(subscription)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(settings.QUIZ_EVENT_BROKER)()
+
+
+def publish_submission_event(submission, created, was_completed):
+    """Push a submission's new progress and how it moves the admin summary counters"""
+    was_in_progress = not created and not was_completed
+    is_in_progress = not submission.is_completed and submission.attempted_count > 0
+    completed_now = submission.is_completed and not was_completed
+
+    get_broker().publish(encode_event(
+        'submission.completed' if completed_now else 'submission.progress',
+        {
+            'submission': {
+                'id': submission.id,
+                'user_id': submission.user_id,
+                'quiz_id': submission.quiz_id,
+                'attempted_count': submission.attempted_count,
+                'correct_count': submission.correct_count,
+                'is_completed': submission.is_completed,
+            },
+            'summary_delta': {
+                'total_submissions': int(created),
+                'completed_submissions': int(submission.is_completed) - int(was_completed),
+                'in_progress_submissions': int(is_in_progress) - int(was_in_progress),
+            },
+        }
+    ))
+
+
+async def submission_event_stream(summary, heartbeat_seconds=15, max_seconds=None):
+    """SSE frames for one dashboard: the summary snapshot, then every published event.
+
+    Django 5.0+ cancels the stream when the client disconnects; older versions
+    never notice, so the stream also ends after ``max_seconds`` and EventSource
+    reconnects with a fresh snapshot.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_seconds if max_seconds else None
+    broker = get_broker()
+    subscription = broker.subscribe()
+    try:
+        yield encode_event('summary', summary)
+        while True:
+            timeout = heartbeat_seconds
+            if deadline is not None:
+                if loop.time() >= deadline:
+                    break
+                timeout = min(timeout, deadline - loop.time())
+            try:
+                yield await asyncio.wait_for(subscription.get(), timeout)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def issue_stream_token(user):
+    """A short-lived token for the stream URL, since EventSource cannot send an Authorization header"""
+    return signing.TimestampSigner(salt=STREAM_TOKEN_SALT).sign(str(user.pk))
+
+
+class StreamTokenAuthentication(BaseAuthentication):
+    """Authenticate a ``?token=`` query parameter issued by issue_stream_token"""
+
+    def authenticate(self, request):
+        token = request.query_params.get('token')
+        if not token:
+            return None
+        try:
+            user_id = signing.TimestampSigner(salt=STREAM_TOKEN_SALT).unsign(
+                token, max_age=settings.SUBMISSION_STREAM['TOKEN_MAX_AGE']
+            )
+        except signing.BadSignature:
+            raise AuthenticationFailed("Invalid or expired stream token")
+        user = get_user_model().objects.filter(pk=user_id, is_active=True).first()
+        if user is None:
+            raise AuthenticationFailed("Invalid or expired stream token")
+        return user, None
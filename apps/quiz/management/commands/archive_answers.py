@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.quiz.services import ArchiveService
+
+
+class Command(BaseCommand):
+    help = "Move old or deactivated-quiz answers out of the live SubmissionAnswer table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-months', type=int, help=f"Archive answers created more than N months ago "
+                                 f"(a month is {ArchiveService.DAYS_PER_MONTH} days)")
+        parser.add_argument('--inactive-quizzes', action='store_true', help="Archive answers for deactivated quizzes")
+        parser.add_argument('--chunk-size', type=int, default=ArchiveService.DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        def progress(archived, last_pk):
+            self.stdout.write(f"archived={archived} last_pk={last_pk}")
+
+        try:
+            archived = ArchiveService.archive_answers(
+                older_than_months=options['older_than_months'],
+                inactive_quizzes=options['inactive_quizzes'],
+                chunk_size=options['chunk_size'],
+                progress=progress,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} answers"))
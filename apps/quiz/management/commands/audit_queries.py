@@ -0,0 +1,235 @@
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from apps.quiz.models import Category, Quiz, Question, Option, Submission, SubmissionAnswer
+from apps.quiz.services import CategoryService, QuizService, QuestionService, SubmissionService
+
+User = get_user_model()
+
+# Indexes this audit recommends, as declared on the models (and created by their migration)
+RECOMMENDED_INDEXES = [
+    (Quiz, 'quiz_active_category_idx'),
+    (Submission, 'submission_updated_at_idx'),
+]
+
+EXPLAIN_PREFIX = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+}
+
+
+class Command(BaseCommand):
+    help = ("EXPLAIN every query the category/quiz/question/submission services run on a seeded dataset, "
+            "flag sequential scans and sorts, and time them with and without the recommended indexes")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument('--quizzes', type=int, default=40)
+        parser.add_argument('--questions', type=int, default=20, help="Questions per seeded quiz")
+        parser.add_argument('--submissions-per-user', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=5, help="Time each call this many times and keep the best")
+        parser.add_argument('--plans', action='store_true', help="Print the full plan of every flagged query")
+        parser.add_argument('--force', action='store_true',
+                            help="Run with DEBUG off; indexes are dropped and rebuilt inside the audit transaction")
+
+    def _seed(self, options):
+        """Synthetic data, rolled back with the rest of the audit"""
+        admin = User.objects.create(username='audit-admin', role='ADMIN')
+        categories = Category.objects.bulk_create([
+            Category(name=f'audit category {i}') for i in range(options['categories'])
+        ])
+        quizzes = Quiz.objects.bulk_create([
+            Quiz(title=f'audit quiz {i}', category=categories[i % len(categories)], created_by=admin,
+                 is_active=i % 4 != 0)
+            for i in range(options['quizzes'])
+        ])
+        questions = Question.objects.bulk_create([
+            Question(quiz=quiz, text=f'audit question {quiz.id}-{i}')
+            for quiz in quizzes for i in range(options['questions'])
+        ], batch_size=1000)
+        Option.objects.bulk_create([
+            Option(question=question, text=f'option {i}', is_correct=i == 0)
+            for question in questions for i in range(4)
+        ], batch_size=1000)
+        users = User.objects.bulk_create([
+            User(username=f'audit-user-{i}') for i in range(options['users'])
+        ], batch_size=1000)
+        per_user = min(options['submissions_per_user'], len(quizzes))
+        Submission.objects.bulk_create([
+            Submission(user=user, quiz=quizzes[(index + offset) % len(quizzes)], attempted_count=offset % 5,
+                       correct_count=offset % 3, is_completed=offset % 2 == 0)
+            for index, user in enumerate(users) for offset in range(per_user)
+        ], batch_size=1000)
+
+        # Answers for every submission to one active quiz, including the audited student's
+        student = users[0]
+        active_quiz = next(quiz for quiz in quizzes if quiz.is_active)
+        Submission.objects.get_or_create(user=student, quiz=active_quiz)
+        quiz_questions = [question for question in questions if question.quiz_id == active_quiz.id]
+        first_options = dict(
+            Option.objects.filter(question__in=quiz_questions, is_correct=True).values_list('question_id', 'id')
+        )
+        SubmissionAnswer.objects.bulk_create([
+            SubmissionAnswer(submission_id=submission_id, question=question,
+                             selected_option_id=first_options[question.id], is_correct=True)
+            for submission_id in Submission.objects.filter(quiz=active_quiz).values_list('id', flat=True)
+            for question in quiz_questions[:5]
+        ], batch_size=1000)
+        return {
+            'category': active_quiz.category,
+            'quiz': active_quiz,
+            'question': quiz_questions[-1],
+            'option': Option.objects.get(id=first_options[quiz_questions[-1].id]),
+            'student': student,
+        }
+
+    def _calls(self, fixtures):
+        category, quiz, student = fixtures['category'], fixtures['quiz'], fixtures['student']
+        counter = iter(range(10 ** 9))
+        return [
+            ('CategoryService.get_all_categories', lambda: list(CategoryService.get_all_categories())),
+            ('CategoryService.get_category_by_id', lambda: CategoryService.get_category_by_id(category.id)),
+            ('QuizService.get_all_quizzes', lambda: list(QuizService.get_all_quizzes())),
+            ('QuizService.get_quiz_by_id', lambda: QuizService.get_quiz_by_id(quiz.id)),
+            ('QuestionService.get_questions_by_quiz', lambda: list(QuestionService.get_questions_by_quiz(quiz.id))),
+            ('QuestionService.create_question_with_options', lambda: QuestionService.create_question_with_options(
+                quiz.id, f'audit new question {next(counter)}', [{'text': 'a', 'is_correct': True}, {'text': 'b'}]
+            )),
+            ('QuestionService.get_question_ids (category)', lambda: (
+                QuestionService.invalidate_question_ids(category_ids=[category.id]),
+                QuestionService.get_question_ids('category', category.id),
+            )),
+            ('SubmissionService.submit_answer', lambda: SubmissionService.submit_answer(
+                student, fixtures['question'].id, fixtures['option'].id
+            )),
+            ('SubmissionService.get_user_submission', lambda: SubmissionService.get_user_submission(student, quiz.id)),
+            ('SubmissionService.get_quiz_submissions', lambda: list(SubmissionService.get_quiz_submissions(quiz.id))),
+            ('SubmissionService.get_submission_summary', SubmissionService.get_submission_summary),
+            ('SubmissionService.get_all_submissions (first page)',
+             lambda: list(SubmissionService.get_all_submissions()[:50])),
+            ('SubmissionService.get_user_all_submissions',
+             lambda: list(SubmissionService.get_user_all_submissions(student))),
+            ('SubmissionService.get_user_quiz_overview', lambda: SubmissionService.get_user_quiz_overview(student)),
+        ]
+
+    @contextmanager
+    def _capture(self):
+        statements = []
+
+        def wrapper(execute, sql, params, many, context):
+            statements.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(wrapper):
+            yield statements
+
+    def _explain(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(EXPLAIN_PREFIX[connection.vendor] + sql, params)
+            rows = cursor.fetchall()
+        if connection.vendor == 'sqlite':
+            return [row[-1] for row in rows]
+        return [row[0] for row in rows]
+
+    def _flags(self, plan):
+        flags = set()
+        for line in plan:
+            step = line.strip().lstrip('->').strip()
+            if connection.vendor == 'sqlite':
+                if step.startswith('SCAN ') and ' INDEX ' not in step:
+                    flags.add(f"seq scan {step.split()[1]}")
+                elif 'TEMP B-TREE' in step:
+                    flags.add('sort')
+            elif step.startswith('Seq Scan on '):
+                flags.add(f"seq scan {step.split()[3]}")
+            elif step.startswith(('Sort ', 'Incremental Sort ')):
+                flags.add('sort')
+        return flags
+
+    def _audit(self, calls, repeat):
+        results = {}
+        for label, call in calls:
+            timings = []
+            for _ in range(repeat):
+                with self._capture() as statements:
+                    started = time.perf_counter()
+                    call()
+                    timings.append((time.perf_counter() - started) * 1000)
+
+            flags, plans = set(), []
+            for sql, params in statements:
+                if not sql.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+                    continue
+                plan = self._explain(sql, params)
+                statement_flags = self._flags(plan)
+                if statement_flags:
+                    flags |= statement_flags
+                    plans.append((sql, plan))
+            results[label] = {'ms': min(timings), 'flags': flags, 'plans': plans}
+        return results
+
+    def _index_statements(self):
+        editor = connection.schema_editor(collect_sql=True)
+        with connection.cursor() as cursor:
+            for model, name in RECOMMENDED_INDEXES:
+                index = next(index for index in model._meta.indexes if index.name == name)
+                exists = name in connection.introspection.get_constraints(cursor, model._meta.db_table)
+                yield index, exists, str(index.create_sql(model, editor)), f"DROP INDEX {connection.ops.quote_name(name)}"
+
+    def _set_indexes(self, present):
+        with connection.cursor() as cursor:
+            for index, exists, create_sql, remove_sql in list(self._index_statements()):
+                if present and not exists:
+                    cursor.execute(create_sql)
+                elif not present and exists:
+                    cursor.execute(remove_sql)
+            cursor.execute('ANALYZE')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in EXPLAIN_PREFIX:
+            raise CommandError(f"audit_queries supports SQLite and PostgreSQL, not {connection.vendor}")
+        if not settings.DEBUG and not options['force']:
+            raise CommandError("Refusing to drop indexes outside development; pass --force on a scratch database")
+
+        missing = [index.name for index, exists, _, _ in self._index_statements() if not exists]
+
+        with transaction.atomic():
+            fixtures = self._seed(options)
+            calls = self._calls(fixtures)
+
+            self._set_indexes(present=False)
+            before = self._audit(calls, options['repeat'])
+            self._set_indexes(present=True)
+            after = self._audit(calls, options['repeat'])
+
+            transaction.set_rollback(True)
+        QuestionService.invalidate_question_ids(quiz_ids=[fixtures['quiz'].id], category_ids=[fixtures['category'].id])
+
+        width = max(len(label) for label in before)
+        self.stdout.write(f"{'service call':<{width}} {'before ms':>10} {'after ms':>9}  flags (before -> after)")
+        for label, result in before.items():
+            flags_before = ', '.join(sorted(result['flags'])) or '-'
+            flags_after = ', '.join(sorted(after[label]['flags'])) or '-'
+            style = self.style.WARNING if after[label]['flags'] else (lambda text: text)
+            self.stdout.write(style(
+                f"{label:<{width}} {result['ms']:>10.2f} {after[label]['ms']:>9.2f}  {flags_before} -> {flags_after}"
+            ))
+            if options['plans']:
+                for sql, plan in after[label]['plans']:
+                    self.stdout.write(f"    {sql}\n      " + "\n      ".join(plan))
+
+        self.stdout.write("Recommended indexes: " + ', '.join(
+            f"{model.__name__}.{name}" for model, name in RECOMMENDED_INDEXES
+        ))
+        if missing:
+            self.stdout.write(self.style.WARNING(
+                f"Missing from this database: {', '.join(missing)}; run `python manage.py migrate quiz`"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS("All recommended indexes are in place"))
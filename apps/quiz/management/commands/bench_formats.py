@@ -0,0 +1,66 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from rest_framework.renderers import JSONRenderer
+
+from apps.quiz.models import Quiz
+from apps.quiz.serializers import AdminSubmissionOverviewSerializer, QuizSerializer, SubmissionSerializer
+from apps.quiz.services import QuizService, SubmissionService
+from utlis import compression, renderers
+
+
+class Command(BaseCommand):
+    help = "Measure bytes on the wire and encode time per response format for the main endpoints"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help="Encode each payload this many times")
+        parser.add_argument('--limit', type=int, default=1000, help="Rows to include in list payloads")
+
+    def _payloads(self, limit):
+        payloads = {}
+        quiz = Quiz.objects.filter(is_active=True).annotate(size=Count('questions')).order_by('-size').first()
+        if quiz:
+            payloads['quiz detail'] = QuizSerializer(QuizService.get_quiz_by_id(quiz.id)).data
+            payloads['quiz submissions'] = SubmissionSerializer(
+                SubmissionService.get_quiz_submissions(quiz.id)[:limit], many=True
+            ).data
+        payloads['admin overview'] = {
+            'summary': SubmissionService.get_submission_summary(),
+            'submissions': AdminSubmissionOverviewSerializer(
+                SubmissionService.get_all_submissions()[:limit], many=True
+            ).data,
+        }
+        return payloads
+
+    def _formats(self):
+        json_renderer = JSONRenderer()
+        formats = {'json': json_renderer.render}
+        if renderers.msgpack is not None:
+            formats['msgpack'] = renderers.MessagePackRenderer().render
+        encodings = ['gzip'] + (['br'] if compression.brotli is not None else [])
+        for name, render in list(formats.items()):
+            for encoding in encodings:
+                formats[f'{name}+{encoding}'] = (
+                    lambda data, render=render, encoding=encoding: compression.compress(render(data), encoding)
+                )
+        return formats
+
+    def handle(self, *args, **options):
+        # Round-trip through JSON so every format encodes plain Python types
+        payloads = {name: json.loads(JSONRenderer().render(data)) for name, data in self._payloads(options['limit']).items()}
+        formats = self._formats()
+
+        self.stdout.write(f"{'endpoint':<18} {'format':<14} {'bytes':>10} {'ratio':>7} {'encode ms':>10}")
+        for endpoint, data in payloads.items():
+            baseline = None
+            for name, encode in formats.items():
+                started = time.perf_counter()
+                for _ in range(options['repeat']):
+                    body = encode(data)
+                elapsed_ms = (time.perf_counter() - started) / options['repeat'] * 1000
+                baseline = baseline or len(body)
+                self.stdout.write(
+                    f"{endpoint:<18} {name:<14} {len(body):>10} {len(body) / baseline:>7.2f} {elapsed_ms:>10.3f}"
+                )
@@ -0,0 +1,84 @@
+import math
+import time
+from array import array
+from statistics import median
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.quiz.services import QuestionService
+
+
+class Command(BaseCommand):
+    help = "Check that random question draws are uniform, stable per student and fast on large banks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bank-size', type=int, default=1_000_000, help="Question ids in the timing bank")
+        parser.add_argument('--count', type=int, default=20, help="Questions per draw")
+        parser.add_argument('--draws', type=int, default=10_000, help="Timed draws, one simulated student each")
+        parser.add_argument('--uniformity-bank', type=int, default=1000)
+        parser.add_argument('--uniformity-draws', type=int, default=50_000)
+        parser.add_argument('--max-draw-ms', type=float, default=1.0,
+                            help="Fail if the 99th percentile draw takes longer than this")
+
+    def _time_cache(self, bank_size):
+        ids = array('q', range(1, bank_size + 1))
+        key = QuestionService._question_ids_key('bench', bank_size)
+        started = time.perf_counter()
+        cache.set(key, ids.tobytes(), 60)
+        stored = time.perf_counter()
+        unpacked = array('q')
+        unpacked.frombytes(cache.get(key))
+        loaded = time.perf_counter()
+        cache.delete(key)
+        self.stdout.write(
+            f"id array: {len(ids.tobytes()) / 1024 / 1024:.1f} MiB, "
+            f"cache set {(stored - started) * 1000:.1f} ms, get {(loaded - stored) * 1000:.1f} ms"
+        )
+        return unpacked
+
+    def _time_draws(self, ids, options):
+        timings = []
+        for user_id in range(options['draws']):
+            seed = QuestionService.sample_seed(user_id, 'quiz', 1)
+            started = time.perf_counter()
+            drawn = QuestionService.draw(ids, options['count'], seed)
+            timings.append((time.perf_counter() - started) * 1000)
+            if len(set(drawn)) != len(drawn):
+                raise CommandError(f"Draw for user {user_id} repeated a question")
+
+        if QuestionService.draw(ids, options['count'], seed) != drawn:
+            raise CommandError("The same student got a different draw")
+
+        timings.sort()
+        p99 = timings[int(len(timings) * 0.99) - 1]
+        self.stdout.write(
+            f"draw {options['count']} of {len(ids)}: median {median(timings) * 1000:.1f} us, p99 {p99 * 1000:.1f} us"
+        )
+        if p99 > options['max_draw_ms']:
+            raise CommandError(f"p99 draw time {p99:.3f} ms is over {options['max_draw_ms']} ms")
+
+    def _check_uniformity(self, options):
+        bank = array('q', range(options['uniformity_bank']))
+        counts = [0] * len(bank)
+        for user_id in range(options['uniformity_draws']):
+            for question_id in QuestionService.draw(bank, options['count'], QuestionService.sample_seed(user_id, 'quiz', 1)):
+                counts[question_id] += 1
+
+        # Chi-square against equal counts; z is its distance from the expected value in standard deviations
+        expected = options['uniformity_draws'] * min(options['count'], len(bank)) / len(bank)
+        chi_square = sum((count - expected) ** 2 / expected for count in counts)
+        degrees = len(bank) - 1
+        z = (chi_square - degrees) / math.sqrt(2 * degrees)
+        self.stdout.write(
+            f"uniformity over {len(bank)} ids: chi2={chi_square:.1f} (df={degrees}), z={z:.2f}, "
+            f"min/max hits {min(counts)}/{max(counts)} vs expected {expected:.0f}"
+        )
+        if abs(z) > 4:
+            raise CommandError("Draws are not uniform")
+
+    def handle(self, *args, **options):
+        ids = self._time_cache(options['bank_size'])
+        self._time_draws(ids, options)
+        self._check_uniformity(options)
+        self.stdout.write(self.style.SUCCESS("Sampling checks passed"))
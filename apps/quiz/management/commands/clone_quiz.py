@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.quiz.services import QuizService
+
+
+class Command(BaseCommand):
+    help = "Copy a quiz with its questions and options as a new, inactive version"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quiz', type=int, required=True, help="Quiz to clone")
+        parser.add_argument('--title', help="Title of the copy (default: the source title)")
+        parser.add_argument('--category', type=int, help="Category of the copy (default: the source category)")
+
+    def handle(self, *args, **options):
+        try:
+            clone = QuizService.clone_quiz(
+                options['quiz'], None, title=options['title'], category_id=options['category']
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f"Cloned quiz {options['quiz']} as quiz {clone.id} (version {clone.version})"))
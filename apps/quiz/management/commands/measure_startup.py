@@ -0,0 +1,69 @@
+import json
+import os
+import subprocess
+import sys
+from statistics import median
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Runs in a fresh interpreter so the numbers reflect a cold worker
+PROBE = """
+import json, os, time
+started = time.perf_counter()
+from config.wsgi import application
+loaded = time.perf_counter()
+from django.test import Client
+client = Client(HTTP_HOST='localhost')
+response = client.get(os.environ['STARTUP_PROBE_PATH'])
+first_request = time.perf_counter()
+print(json.dumps({
+    'import_ms': (loaded - started) * 1000,
+    'first_request_ms': (first_request - loaded) * 1000,
+    'status': response.status_code,
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = "Measure cold import time and time to first request for a settings profile"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', default=os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings.dev'),
+                            help="Settings module to start, e.g. config.settings.prod")
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--path', default='/api/auth/login/', help="Request path for the first request")
+        parser.add_argument('--top', type=int, default=10, help="Show the slowest N imports from -X importtime")
+
+    def _run(self, options, importtime=False):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': options['profile'], 'STARTUP_PROBE_PATH': options['path']}
+        command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', PROBE]
+        return subprocess.run(command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True)
+
+    def _slowest_imports(self, stderr, top):
+        imports = []
+        for line in stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            if not name.startswith('  '):
+                imports.append((int(cumulative), name.strip()))
+        return sorted(imports, reverse=True)[:top]
+
+    def handle(self, *args, **options):
+        runs = [json.loads(self._run(options).stdout.strip().splitlines()[-1]) for _ in range(options['runs'])]
+        result = {
+            'profile': options['profile'],
+            'runs': options['runs'],
+            'import_ms': round(median(run['import_ms'] for run in runs), 1),
+            'first_request_ms': round(median(run['first_request_ms'] for run in runs), 1),
+            'first_request_status': runs[-1]['status'],
+        }
+
+        if options['top']:
+            self.stdout.write("Slowest top-level imports (cumulative us):")
+            for cumulative, name in self._slowest_imports(self._run(options, importtime=True).stderr, options['top']):
+                self.stdout.write(f"  {cumulative:>10}  {name}")
+
+        # One JSON line per run so results can be appended to a file and compared across releases
+        self.stdout.write(json.dumps(result))
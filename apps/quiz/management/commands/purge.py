@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.quiz.services import PurgeService
+
+
+class Command(BaseCommand):
+    help = "Hide a category or quiz and delete it with its dependents in small batches, or resume queued purges"
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--quiz', type=int, help="Purge this quiz")
+        target.add_argument('--category', type=int, help="Purge this category and all of its quizzes")
+        target.add_argument('--resume', action='store_true',
+                            help="Run every queued or failed purge job, and running ones that stopped making "
+                                 "progress (the background worker)")
+        parser.add_argument('--batch-size', type=int, default=PurgeService.DEFAULT_BATCH_SIZE)
+        parser.add_argument('--loop', type=int, metavar='SECONDS',
+                            help="With --resume, keep polling for new jobs every SECONDS")
+
+    def _progress(self, job, step, deleted):
+        self.stdout.write(f"job {job.id} {job.target} {job.target_id}: {step} deleted={deleted}")
+
+    def _run(self, job, batch_size):
+        try:
+            if PurgeService.run_job(job, batch_size=batch_size, progress=self._progress) is None:
+                self.stdout.write(f"job {job.id} is being run by another worker, skipped")
+                return
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"job {job.id} failed: {e}"))
+            return
+        self.stdout.write(self.style.SUCCESS(f"job {job.id} done: {job.deleted_counts}"))
+
+    def handle(self, *args, **options):
+        if not options['resume']:
+            target, target_id = ('quiz', options['quiz']) if options['quiz'] else ('category', options['category'])
+            try:
+                job = PurgeService.request_purge(target, target_id)
+            except ValueError as e:
+                raise CommandError(str(e))
+            self._run(job, options['batch_size'])
+            return
+
+        while True:
+            for job in PurgeService.get_unfinished_jobs():
+                self._run(job, options['batch_size'])
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
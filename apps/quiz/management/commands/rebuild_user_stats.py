@@ -0,0 +1,57 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Max, Min
+
+from apps.quiz.services import UserStatsService
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-user category statistics from submissions and the answer log"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1,
+                            help="Split the user id range across this many parallel workers")
+        parser.add_argument('--user-from', type=int, help="First user id to rebuild (inclusive)")
+        parser.add_argument('--user-to', type=int, help="Last user id to rebuild (inclusive)")
+        parser.add_argument('--chunk-size', type=int, default=UserStatsService.DEFAULT_CHUNK_SIZE)
+
+    def _user_ranges(self, user_from, user_to, workers):
+        bounds = User.objects.aggregate(low=Min('id'), high=Max('id'))
+        low = user_from if user_from is not None else bounds['low']
+        high = user_to if user_to is not None else bounds['high']
+        if low is None or high is None or low > high:
+            return []
+
+        step = -(-(high - low + 1) // max(workers, 1))
+        return [(start, min(start + step - 1, high)) for start in range(low, high + 1, step)]
+
+    def _rebuild_range(self, user_range, options):
+        def progress(users, last_pk):
+            if options['verbosity'] >= 2:
+                self.stdout.write(f"users {user_range[0]}-{user_range[1]}: rebuilt={users} last_pk={last_pk}")
+
+        try:
+            return UserStatsService.rebuild(
+                user_id_from=user_range[0],
+                user_id_to=user_range[1],
+                chunk_size=options['chunk_size'],
+                progress=progress,
+            )
+        finally:
+            connection.close()
+
+    def handle(self, *args, **options):
+        ranges = self._user_ranges(options['user_from'], options['user_to'], options['workers'])
+        if not ranges:
+            self.stdout.write("No users to rebuild")
+            return
+
+        with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+            rebuilt = sum(executor.map(lambda user_range: self._rebuild_range(user_range, options), ranges))
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt statistics for {rebuilt} users"))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.quiz.services import RegradeService
+
+
+class Command(BaseCommand):
+    help = "Recompute answer correctness and submission scores after an answer-key change"
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--quiz', type=int, help="Regrade every answer in this quiz")
+        target.add_argument('--question', type=int, help="Regrade answers to a single question")
+        parser.add_argument('--chunk-size', type=int, default=RegradeService.DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--start-after', type=int, default=0,
+                            help="Resume after this SubmissionAnswer id (printed as last_pk on progress)")
+
+    def handle(self, *args, **options):
+        def progress(scanned, answers_changed, last_pk):
+            self.stdout.write(f"scanned={scanned} changed={answers_changed} last_pk={last_pk}")
+
+        try:
+            result = RegradeService.regrade(
+                quiz_id=options['quiz'],
+                question_id=options['question'],
+                chunk_size=options['chunk_size'],
+                start_after=options['start_after'],
+                progress=progress,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Regraded {result['answers_scanned']} answers: "
+            f"{result['answers_changed']} changed, {result['submissions_updated']} submissions updated"
+        ))
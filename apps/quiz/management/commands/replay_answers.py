@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.quiz.services import AnswerLogService
+
+
+class Command(BaseCommand):
+    help = "Rebuild submission answers from the answer event log, optionally as of a point in time"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--until', help="Replay events recorded at or before this ISO 8601 datetime")
+        parser.add_argument('--until-sequence', type=int, help="Replay events up to and including this sequence number")
+        parser.add_argument('--quiz', type=int, help="Only replay events for this quiz")
+        parser.add_argument('--submission', type=int, action='append', dest='submissions',
+                            help="Only replay this submission (repeatable)")
+        parser.add_argument('--chunk-size', type=int, default=AnswerLogService.DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--apply', action='store_true',
+                            help="Write the replayed state back to submissions; without it this is a dry run")
+        parser.add_argument('--backfill', action='store_true',
+                            help="Seed the log from answers recorded before it existed, then exit")
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            created = AnswerLogService.backfill(
+                progress=lambda events: self.stdout.write(f"backfilled={events}")
+            )
+            self.stdout.write(self.style.SUCCESS(f"Backfilled {created} answer events"))
+            return
+
+        until = options['until']
+        if until:
+            until = parse_datetime(until)
+            if until is None:
+                raise CommandError("--until must be an ISO 8601 datetime")
+            if timezone.is_naive(until):
+                until = timezone.make_aware(until)
+
+        started = timezone.now()
+        state, replayed = AnswerLogService.replay(
+            until=until,
+            until_sequence=options['until_sequence'],
+            quiz_id=options['quiz'],
+            submission_ids=options['submissions'],
+            chunk_size=options['chunk_size'],
+            progress=lambda events, submissions: self.stdout.write(f"events={events} submissions={submissions}"),
+        )
+        elapsed = (timezone.now() - started).total_seconds()
+        self.stdout.write(
+            f"Replayed {replayed} events into {len(state)} submissions in {elapsed:.2f}s"
+        )
+
+        if not options['apply']:
+            self.stdout.write("Dry run; pass --apply to write this state back")
+            return
+
+        updated = AnswerLogService.apply(
+            state, progress=lambda submissions: self.stdout.write(f"applied={submissions}")
+        )
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {updated} submissions from the log"))
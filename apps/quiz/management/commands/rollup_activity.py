@@ -0,0 +1,62 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from apps.quiz.services import RollupService
+
+
+class Command(BaseCommand):
+    help = "Fold new activity into the hourly and daily rollups, or backfill past days in parallel"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backfill-days', type=int,
+                            help="Rebuild the rollups of this many days before today, then catch up")
+        parser.add_argument('--workers', type=int, default=1,
+                            help="With --backfill-days, split the days across this many parallel workers")
+        parser.add_argument('--loop', type=int, metavar='SECONDS',
+                            help="Keep running the incremental job every SECONDS")
+
+    def _backfill_range(self, day_range, options):
+        def progress(day):
+            if options['verbosity'] >= 2:
+                self.stdout.write(f"built {day}")
+
+        try:
+            return RollupService.backfill(day_range[0], day_range[1], progress=progress)
+        finally:
+            connection.close()
+
+    def _backfill(self, options):
+        days = options['backfill_days']
+        if days < 1:
+            raise CommandError("--backfill-days must be at least 1")
+        today = timezone.localdate()
+        first_day = today - timedelta(days=days)
+        step = -(-days // max(options['workers'], 1))
+        last_day = today - timedelta(days=1)
+        ranges = [
+            (first_day + timedelta(days=offset), min(first_day + timedelta(days=offset + step - 1), last_day))
+            for offset in range(0, days, step)
+        ]
+        with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+            built = sum(executor.map(lambda day_range: self._backfill_range(day_range, options), ranges))
+        RollupService.advance_watermarks(first_day, today)
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {built} days from {first_day}"))
+
+    def _incremental(self):
+        built = RollupService.run_incremental()
+        self.stdout.write(f"Built {built['hour']} hourly and {built['day']} daily buckets")
+
+    def handle(self, *args, **options):
+        if options['backfill_days'] is not None:
+            self._backfill(options)
+
+        while True:
+            self._incremental()
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
@@ -0,0 +1,62 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Max, Min
+
+from apps.quiz.models import Submission
+from apps.quiz.services import SubmissionAuditService
+
+
+class Command(BaseCommand):
+    help = "Compare stored Submission counters with SubmissionAnswer aggregates and optionally repair them"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true', help="Write the expected counters back")
+        parser.add_argument('--workers', type=int, default=1,
+                            help="Split the quiz id range across this many parallel workers")
+        parser.add_argument('--quiz-from', type=int, help="First quiz id to check (inclusive)")
+        parser.add_argument('--quiz-to', type=int, help="Last quiz id to check (inclusive)")
+        parser.add_argument('--chunk-size', type=int, default=SubmissionAuditService.DEFAULT_CHUNK_SIZE)
+
+    def _quiz_ranges(self, quiz_from, quiz_to, workers):
+        bounds = Submission.objects.aggregate(low=Min('quiz_id'), high=Max('quiz_id'))
+        low = quiz_from if quiz_from is not None else bounds['low']
+        high = quiz_to if quiz_to is not None else bounds['high']
+        if low is None or high is None or low > high:
+            return []
+
+        step = -(-(high - low + 1) // max(workers, 1))
+        return [(start, min(start + step - 1, high)) for start in range(low, high + 1, step)]
+
+    def _check_range(self, quiz_range, options):
+        try:
+            mismatches = []
+            for mismatch in SubmissionAuditService.find_mismatches(
+                quiz_id_from=quiz_range[0],
+                quiz_id_to=quiz_range[1],
+                chunk_size=options['chunk_size'],
+            ):
+                mismatches.append(mismatch)
+                if options['verbosity'] >= 2:
+                    pk, stored, expected = mismatch
+                    self.stdout.write(f"submission {pk}: stored={stored} expected={expected}")
+
+            repaired = SubmissionAuditService.repair(mismatches, options['chunk_size']) if options['repair'] else 0
+            return len(mismatches), repaired
+        finally:
+            connection.close()
+
+    def handle(self, *args, **options):
+        ranges = self._quiz_ranges(options['quiz_from'], options['quiz_to'], options['workers'])
+        if not ranges:
+            self.stdout.write("No submissions to verify")
+            return
+
+        with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+            results = list(executor.map(lambda quiz_range: self._check_range(quiz_range, options), ranges))
+
+        found = sum(result[0] for result in results)
+        repaired = sum(result[1] for result in results)
+        style = self.style.WARNING if found and not options['repair'] else self.style.SUCCESS
+        self.stdout.write(style(f"Found {found} inconsistent submissions, repaired {repaired}"))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0002_submission_submissionanswer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='has_archived_answers',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='ArchivedSubmissionAnswer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_correct', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='quiz.question')),
+                ('selected_option', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='quiz.option')),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_answers', to='quiz.submission')),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0004_category_is_deleted_quiz_is_deleted_purgejob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.BigIntegerField()),
+                ('quiz_id', models.BigIntegerField()),
+                ('submission_id', models.BigIntegerField()),
+                ('question_id', models.BigIntegerField()),
+                ('option_id', models.BigIntegerField()),
+                ('is_correct', models.BooleanField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['submission_id', 'id'], name='quiz_answer_submiss_a64d6e_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:55
+
+from django.db import migrations, models
+
+
+def backfill_completed_at(apps, schema_editor):
+    # Best available guess for submissions completed before completed_at existed
+    Submission = apps.get_model('quiz', 'Submission')
+    completed = Submission.objects.filter(is_completed=True, completed_at__isnull=True)
+    while True:
+        pks = list(completed.order_by('pk').values_list('pk', flat=True)[:5000])
+        if not pks:
+            return
+        Submission.objects.filter(pk__in=pks).update(completed_at=models.F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0006_usercategorystats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('category_id', models.BigIntegerField()),
+                ('quiz_id', models.BigIntegerField(blank=True, null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('correct_answers', models.PositiveIntegerField(default=0)),
+                ('completions', models.PositiveIntegerField(default=0)),
+                ('active_users', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4, unique=True)),
+                ('processed_until', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(backfill_completed_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='answerevent',
+            index=models.Index(fields=['created_at'], name='quiz_answer_created_74ea96_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activityrollup',
+            index=models.Index(fields=['period', 'quiz_id', 'bucket_start'], name='quiz_activi_period_bfe3ae_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='activityrollup',
+            constraint=models.UniqueConstraint(fields=('period', 'category_id', 'quiz_id', 'bucket_start'), name='unique_quiz_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='activityrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('quiz_id__isnull', True)), fields=('period', 'category_id', 'bucket_start'), name='unique_category_rollup'),
+        ),
+    ]
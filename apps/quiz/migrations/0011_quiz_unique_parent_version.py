@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def link_versions_to_root(apps, schema_editor):
+    # Clones used to point at the quiz they were copied from and could share a number;
+    # hang every version off its original quiz and number the family in creation order.
+    Quiz = apps.get_model('quiz', 'Quiz')
+    parents = dict(Quiz.objects.filter(parent__isnull=False).values_list('id', 'parent_id'))
+    families = {}
+    for quiz_id in sorted(parents):
+        root = parents[quiz_id]
+        while root in parents:
+            root = parents[root]
+        families.setdefault(root, []).append(quiz_id)
+    root_versions = dict(Quiz.objects.filter(id__in=families).values_list('id', 'version'))
+    for root, quiz_ids in families.items():
+        for version, quiz_id in enumerate(quiz_ids, start=root_versions[root] + 1):
+            Quiz.objects.filter(id=quiz_id).update(parent_id=root, version=version)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0010_quiz_admin_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(link_versions_to_root, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='quiz',
+            constraint=models.UniqueConstraint(fields=('parent', 'version'), name='quiz_unique_parent_version'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 User = get_user_model()
 
@@ -7,6 +8,7 @@ class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    is_deleted = models.BooleanField(default=False)
     
     class Meta:
         verbose_name_plural = "Categories"
@@ -15,15 +17,29 @@ class Category(models.Model):
         return self.name
 
 class Quiz(models.Model):
-    title = models.CharField(max_length=200)
+    # Indexed for the admin's prefix search (Postgres also gets a pattern_ops index for LIKE)
+    title = models.CharField(max_length=200, db_index=True)
     description = models.TextField(blank=True)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='quizzes')
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
+    is_deleted = models.BooleanField(default=False)
+    parent = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='versions')
+    version = models.PositiveIntegerField(default=1)
     
     class Meta:
         verbose_name_plural = "Quizzes"
+        indexes = [
+            models.Index(fields=['category'], condition=models.Q(is_active=True), name='quiz_active_category_idx'),
+            # Admin changelist filters, newest first. The common values are found by walking the pk
+            # backwards, so only the rare ones get a (small, partial) index.
+            models.Index(fields=['-id'], condition=models.Q(is_active=False), name='quiz_inactive_idx'),
+            models.Index(fields=['-id'], condition=models.Q(is_deleted=True), name='quiz_deleted_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['parent', 'version'], name='quiz_unique_parent_version'),
+        ]
     
     def __str__(self):
         return self.title
@@ -51,14 +67,25 @@ class Submission(models.Model):
     attempted_count = models.IntegerField(default=0)
     correct_count = models.IntegerField(default=0)
     is_completed = models.BooleanField(default=False)
+    has_archived_answers = models.BooleanField(default=False)
+    completed_at = models.DateTimeField(null=True, blank=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         unique_together = ['user', 'quiz']
+        indexes = [models.Index(fields=['-updated_at'], name='submission_updated_at_idx')]
     
     def __str__(self):
         return f"{self.user.username} - {self.quiz.title}"
+    
+    @property
+    def all_answers(self):
+        """Live answers plus any that have been moved to the archive"""
+        answers = list(self.answers.all())
+        if self.has_archived_answers:
+            answers.extend(self.archived_answers.all())
+        return answers
 
 class SubmissionAnswer(models.Model):
     submission = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='answers')
@@ -72,3 +99,128 @@ class SubmissionAnswer(models.Model):
     
     def __str__(self):
         return f"{self.submission.user.username} - {self.question.text[:30]}..."
+
+
+class ArchivedSubmissionAnswer(models.Model):
+    submission = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='archived_answers')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='+')
+    selected_option = models.ForeignKey(Option, on_delete=models.CASCADE, related_name='+')
+    is_correct = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.submission.user.username} - {self.question.text[:30]}... (archived)"
+
+
+class PurgeJob(models.Model):
+    TARGET_CHOICES = (
+        ("category", "Category"),
+        ("quiz", "Quiz"),
+    )
+    STATUS_CHOICES = (
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    )
+    target = models.CharField(max_length=10, choices=TARGET_CHOICES)
+    target_id = models.BigIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    deleted_counts = models.JSONField(default=dict)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Purge {self.target} {self.target_id} ({self.status})"
+
+
+class AnswerEvent(models.Model):
+    """Append-only log of every submitted answer; the id is the event sequence number.
+
+    Plain integer columns instead of foreign keys keep appends to a single
+    narrow insert and let the log outlive the rows it refers to.
+    """
+    user_id = models.BigIntegerField()
+    quiz_id = models.BigIntegerField()
+    submission_id = models.BigIntegerField()
+    question_id = models.BigIntegerField()
+    option_id = models.BigIntegerField()
+    is_correct = models.BooleanField()
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        indexes = [models.Index(fields=['submission_id', 'id']), models.Index(fields=['created_at'])]
+    
+    def __str__(self):
+        return f"#{self.id} submission {self.submission_id} question {self.question_id} -> {self.option_id}"
+
+
+class UserCategoryStats(models.Model):
+    """A user's running totals in one category; the row without a category holds their overall totals"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='category_stats')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    quizzes_started = models.PositiveIntegerField(default=0)
+    quizzes_completed = models.PositiveIntegerField(default=0)
+    questions_attempted = models.PositiveIntegerField(default=0)
+    correct_answers = models.PositiveIntegerField(default=0)
+    # Consecutive days with at least one answer, ending on last_activity_date
+    current_streak = models.PositiveIntegerField(default=0)
+    longest_streak = models.PositiveIntegerField(default=0)
+    last_activity_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'category'], name='unique_user_category_stats'),
+            models.UniqueConstraint(fields=['user'], condition=models.Q(category__isnull=True),
+                                    name='unique_user_overall_stats'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.category.name if self.category else 'overall'}"
+
+
+class ActivityRollup(models.Model):
+    """Activity totals for one closed hour or day, per quiz and per whole category (quiz_id is null)
+
+    Ids are plain integers so reports keep their history after a purge.
+    """
+    PERIOD_CHOICES = [
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    ]
+    
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    bucket_start = models.DateTimeField()
+    category_id = models.BigIntegerField()
+    quiz_id = models.BigIntegerField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    correct_answers = models.PositiveIntegerField(default=0)
+    completions = models.PositiveIntegerField(default=0)
+    active_users = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'category_id', 'quiz_id', 'bucket_start'],
+                                    name='unique_quiz_rollup'),
+            models.UniqueConstraint(fields=['period', 'category_id', 'bucket_start'],
+                                    condition=models.Q(quiz_id__isnull=True), name='unique_category_rollup'),
+        ]
+        indexes = [models.Index(fields=['period', 'quiz_id', 'bucket_start'])]
+    
+    def __str__(self):
+        scope = f"quiz {self.quiz_id}" if self.quiz_id else f"category {self.category_id}"
+        return f"{scope} {self.period} {timezone.localtime(self.bucket_start):%Y-%m-%d %H:%M}"
+
+
+class RollupWatermark(models.Model):
+    """Start of the first bucket of each period that the incremental rollup job has not built yet"""
+    period = models.CharField(max_length=4, choices=ActivityRollup.PERIOD_CHOICES, unique=True)
+    processed_until = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.period} rollups up to {timezone.localtime(self.processed_until):%Y-%m-%d %H:%M}"
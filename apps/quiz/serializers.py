@@ -1,5 +1,10 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Category, Quiz, Question, Option, Submission, SubmissionAnswer
+from .models import Category, Quiz, Question, Option, Submission, SubmissionAnswer, PurgeJob, AnswerEvent, UserCategoryStats
+from .services import UserStatsService
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -25,7 +30,7 @@ class QuizSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Quiz
-        fields = ['id', 'title', 'description', 'category', 'questions', 'questions_count']
+        fields = ['id', 'title', 'description', 'category', 'parent_id', 'version', 'questions', 'questions_count']
     
     def get_questions_count(self, obj):
         return obj.questions.count()
@@ -35,6 +40,10 @@ class CreateQuizSerializer(serializers.Serializer):
     description = serializers.CharField(required=False, allow_blank=True)
     category_id = serializers.IntegerField()
 
+class CloneQuizSerializer(serializers.Serializer):
+    title = serializers.CharField(max_length=200, required=False)
+    category_id = serializers.IntegerField(required=False)
+
 class CreateOptionSerializer(serializers.Serializer):
     text = serializers.CharField(max_length=200)
     is_correct = serializers.BooleanField(default=False)
@@ -51,6 +60,36 @@ class SubmitAnswerSerializer(serializers.Serializer):
     question_id = serializers.IntegerField()
     option_id = serializers.IntegerField()
 
+class RegradeSerializer(serializers.Serializer):
+    question_id = serializers.IntegerField(required=False)
+    chunk_size = serializers.IntegerField(required=False, min_value=1)
+    start_after = serializers.IntegerField(required=False, min_value=0, default=0)
+
+class ActivityReportSerializer(serializers.Serializer):
+    period = serializers.ChoiceField(choices=['hour', 'day'], default='day')
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    category_id = serializers.IntegerField(required=False)
+    quiz_id = serializers.IntegerField(required=False)
+    
+    def validate(self, data):
+        max_days = settings.ROLLUP_REPORT_MAX_DAYS[data['period']]
+        data.setdefault('end', timezone.localdate())
+        data.setdefault('start', data['end'] - timedelta(days=min(max_days, 30) - 1))
+        if data['start'] > data['end']:
+            raise serializers.ValidationError("start must not be after end")
+        if (data['end'] - data['start']).days >= max_days:
+            raise serializers.ValidationError(f"{data['period']} reports cover at most {max_days} days")
+        return data
+
+class QuestionSampleSerializer(serializers.Serializer):
+    count = serializers.IntegerField(min_value=1, max_value=200, default=20)
+
+class PurgeJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PurgeJob
+        fields = ['id', 'target', 'target_id', 'status', 'deleted_counts', 'error', 'created_at', 'updated_at']
+
 class SubmissionAnswerSerializer(serializers.ModelSerializer):
     question_text = serializers.CharField(source='question.text', read_only=True)
     selected_option_text = serializers.CharField(source='selected_option.text', read_only=True)
@@ -62,7 +101,7 @@ class SubmissionAnswerSerializer(serializers.ModelSerializer):
 class SubmissionSerializer(serializers.ModelSerializer):
     quiz_title = serializers.CharField(source='quiz.title', read_only=True)
     username = serializers.CharField(source='user.username', read_only=True)
-    answers = SubmissionAnswerSerializer(many=True, read_only=True)
+    answers = SubmissionAnswerSerializer(source='all_answers', many=True, read_only=True)
     score_percentage = serializers.SerializerMethodField()
     
     class Meta:
@@ -110,4 +149,28 @@ class AdminSubmissionOverviewSerializer(serializers.ModelSerializer):
         elif obj.attempted_count > 0:
             return "In Progress"
         else:
-            return "Not Started"
\ No newline at end of file
+            return "Not Started"
+
+class AnswerEventSerializer(serializers.ModelSerializer):
+    sequence = serializers.IntegerField(source='id', read_only=True)
+    
+    class Meta:
+        model = AnswerEvent
+        fields = ['sequence', 'question_id', 'option_id', 'is_correct', 'created_at']
+
+
+class UserCategoryStatsSerializer(serializers.ModelSerializer):
+    category_name = serializers.CharField(source='category.name', read_only=True, default=None)
+    average_score = serializers.SerializerMethodField()
+    current_streak = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = UserCategoryStats
+        fields = ['category_id', 'category_name', 'quizzes_started', 'quizzes_completed', 'questions_attempted',
+                  'correct_answers', 'average_score', 'current_streak', 'longest_streak', 'last_activity_date']
+    
+    def get_average_score(self, obj):
+        return UserStatsService.average_score(obj)
+    
+    def get_current_streak(self, obj):
+        return UserStatsService.active_streak(obj)
@@ -1,5 +1,28 @@
-from .models import Category, Quiz, Question, Option, Submission, SubmissionAnswer
+from .models import (
+    Category, Quiz, Question, Option, Submission, SubmissionAnswer, ArchivedSubmissionAnswer, PurgeJob, AnswerEvent,
+    UserCategoryStats, ActivityRollup, RollupWatermark
+)
+from .events import publish_submission_event
 from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.utils import timezone
+from datetime import datetime, time, timedelta
+from array import array
+from itertools import chain
+import hashlib
+import math
+import random
+import statistics
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+from django.db.models import Case, Count, Exists, F, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest, TruncDate
 
 User = get_user_model()
 
@@ -10,12 +33,12 @@ class CategoryService:
     
     @staticmethod
     def get_all_categories():
-        return Category.objects.all()
+        return Category.objects.filter(is_deleted=False)
     
     @staticmethod
     def get_category_by_id(category_id):
         try:
-            return Category.objects.get(id=category_id)
+            return Category.objects.get(id=category_id, is_deleted=False)
         except Category.DoesNotExist:
             return None
 
@@ -32,6 +55,58 @@ class QuizService:
             category=category
         )
     
+    @staticmethod
+    def clone_quiz(quiz_id, user, title=None, category_id=None, batch_size=1000):
+        """Copy a quiz with all of its questions and options as a new, inactive version
+
+        The copy is linked to the original quiz of the family and numbered
+        one past its newest version, whichever version it was copied from.
+        Questions are bulk inserted and their new ids mapped back onto the
+        copied options, so a quiz costs a handful of statements however
+        large it is.
+        """
+        try:
+            source = Quiz.objects.get(id=quiz_id, is_deleted=False)
+        except Quiz.DoesNotExist:
+            raise ValueError("Quiz not found")
+        if category_id is not None and not CategoryService.get_category_by_id(category_id):
+            raise ValueError("Category not found")
+        
+        with transaction.atomic():
+            # Every version hangs off the original quiz. Locking it serializes clones of the
+            # family, so the next number is read after any concurrent clone has committed.
+            root = Quiz.objects.select_for_update().get(id=source.parent_id or source.id)
+            latest = Quiz.objects.filter(Q(id=root.id) | Q(parent_id=root.id)).aggregate(Max('version'))
+            clone = Quiz.objects.create(
+                title=title or source.title,
+                description=source.description,
+                category_id=category_id or source.category_id,
+                created_by=user or source.created_by,
+                is_active=False,
+                parent=root,
+                version=latest['version__max'] + 1
+            )
+            
+            source_questions = list(Question.objects.filter(quiz_id=source.id).order_by('id').values_list('id', 'text'))
+            # bulk_create returns the new rows in input order with their ids set
+            copies = Question.objects.bulk_create(
+                [Question(quiz_id=clone.id, text=text) for _, text in source_questions],
+                batch_size=batch_size
+            )
+            question_ids = {old_id: copy.id for (old_id, _), copy in zip(source_questions, copies)}
+            
+            options = Option.objects.filter(question__quiz_id=source.id).order_by('id').values_list(
+                'question_id', 'text', 'is_correct'
+            )
+            Option.objects.bulk_create(
+                [
+                    Option(question_id=question_ids[question_id], text=text, is_correct=is_correct)
+                    for question_id, text, is_correct in options.iterator(chunk_size=batch_size)
+                ],
+                batch_size=batch_size
+            )
+        return clone
+    
     @staticmethod
     def get_all_quizzes():
         return Quiz.objects.select_related('category', 'created_by').filter(is_active=True)
@@ -74,18 +149,81 @@ class QuestionService:
                 is_correct=option_data.get('is_correct', False)
             )
         
+        QuestionService.invalidate_question_ids(quiz_ids=[quiz.id], category_ids=[quiz.category_id])
         return question
     
     @staticmethod
     def get_questions_by_quiz(quiz_id):
         return Question.objects.filter(quiz_id=quiz_id).prefetch_related('options')
     
+    @staticmethod
+    def _question_ids_key(scope, scope_id):
+        return f"question_ids:{scope}:{scope_id}"
+    
+    @staticmethod
+    def get_question_ids(scope, scope_id):
+        """Sorted ids of the questions a quiz or category can draw from, cached as a packed int64 array"""
+        key = QuestionService._question_ids_key(scope, scope_id)
+        packed = cache.get(key)
+        if packed is None:
+            if scope == 'quiz':
+                questions = Question.objects.filter(quiz_id=scope_id)
+            else:
+                questions = Question.objects.filter(quiz__category_id=scope_id)
+            questions = questions.filter(quiz__is_active=True, quiz__is_deleted=False)
+            packed = array('q', questions.order_by('id').values_list('id', flat=True)).tobytes()
+            cache.set(key, packed, settings.QUESTION_SAMPLE_CACHE_SECONDS)
+        ids = array('q')
+        ids.frombytes(packed)
+        return ids
+    
+    @staticmethod
+    def invalidate_question_ids(quiz_ids=(), category_ids=()):
+        keys = [QuestionService._question_ids_key('quiz', quiz_id) for quiz_id in quiz_ids]
+        keys += [QuestionService._question_ids_key('category', category_id) for category_id in category_ids]
+        cache.delete_many(keys)
+    
+    @staticmethod
+    def sample_seed(user_id, scope, scope_id):
+        digest = hashlib.sha256(f"{user_id}:{scope}:{scope_id}".encode()).digest()
+        return int.from_bytes(digest[:8], 'big')
+    
+    @staticmethod
+    def draw(ids, count, seed):
+        # sample() over a range picks k indexes in O(k) without materialising the bank
+        rng = random.Random(seed)
+        return [ids[index] for index in rng.sample(range(len(ids)), min(count, len(ids)))]
+    
+    @staticmethod
+    def sample_questions(user, count, quiz_id=None, category_id=None, _redrawn=False):
+        """The same random questions every time for a given user and quiz/category, while the bank is unchanged"""
+        scope, scope_id = ('quiz', quiz_id) if quiz_id is not None else ('category', category_id)
+        ids = QuestionService.get_question_ids(scope, scope_id)
+        if not ids:
+            raise ValueError(f"{scope.capitalize()} has no questions to draw from")
+        
+        drawn = QuestionService.draw(ids, count, QuestionService.sample_seed(user.id, scope, scope_id))
+        if scope == 'quiz':
+            questions = QuestionService.get_questions_by_quiz(quiz_id)
+        else:
+            questions = Question.objects.prefetch_related('options')
+        questions = questions.in_bulk(drawn)
+        if len(questions) < len(drawn) and not _redrawn:
+            # Questions were deleted behind the cache's back; draw again from a fresh id list
+            if scope == 'quiz':
+                QuestionService.invalidate_question_ids(quiz_ids=[scope_id])
+            else:
+                QuestionService.invalidate_question_ids(category_ids=[scope_id])
+            return QuestionService.sample_questions(user, count, quiz_id, category_id, _redrawn=True)
+        return [questions[question_id] for question_id in drawn if question_id in questions]
+    
     @staticmethod
     def toggle_quiz_status(quiz_id):
         try:
-            quiz = Quiz.objects.get(id=quiz_id)
+            quiz = Quiz.objects.get(id=quiz_id, is_deleted=False)
             quiz.is_active = not quiz.is_active
             quiz.save()
+            QuestionService.invalidate_question_ids(quiz_ids=[quiz.id], category_ids=[quiz.category_id])
             return quiz
         except Quiz.DoesNotExist:
             raise ValueError("Quiz not found")
@@ -94,7 +232,7 @@ class SubmissionService:
     @staticmethod
     def submit_answer(user, question_id, option_id):
         try:
-            question = Question.objects.get(id=question_id)
+            question = Question.objects.select_related('quiz').get(id=question_id, quiz__is_deleted=False)
             option = Option.objects.get(id=option_id, question=question)
         except (Question.DoesNotExist, Option.DoesNotExist):
             raise ValueError("Question or option not found")
@@ -105,6 +243,10 @@ class SubmissionService:
             quiz=question.quiz,
             defaults={'attempted_count': 0, 'correct_count': 0}
         )
+        # Already loaded, so serializing the submission does not fetch them again
+        submission.user, submission.quiz = user, question.quiz
+        was_completed = submission.is_completed
+        previous_attempted, previous_correct = submission.attempted_count, submission.correct_count
         
         # Check if answer already exists
         answer, answer_created = SubmissionAnswer.objects.get_or_create(
@@ -116,6 +258,13 @@ class SubmissionService:
             }
         )
         
+        # An archived answer still counts towards the submission, so replacing it is an update
+        archived_answer = None
+        if answer_created and submission.has_archived_answers:
+            archived_answer = ArchivedSubmissionAnswer.objects.filter(
+                submission=submission, question=question
+            ).first()
+        
         # If answer already exists, update it
         if not answer_created:
             # Remove previous correct count if it was correct
@@ -125,6 +274,10 @@ class SubmissionService:
             answer.selected_option = option
             answer.is_correct = option.is_correct
             answer.save()
+        elif archived_answer:
+            if archived_answer.is_correct:
+                submission.correct_count -= 1
+            archived_answer.delete()
         else:
             submission.attempted_count += 1
         
@@ -135,23 +288,65 @@ class SubmissionService:
         # Check if quiz is completed
         total_questions = question.quiz.questions.count()
         submission.is_completed = submission.attempted_count == total_questions
+        if submission.is_completed and not was_completed:
+            submission.completed_at = timezone.now()
         submission.save()
         
+        AnswerLogService.append(submission, question, option)
+        UserStatsService.record(
+            user.id,
+            question.quiz.category_id,
+            started=int(created),
+            completed=int(submission.is_completed) - int(was_completed),
+            attempted=submission.attempted_count - previous_attempted,
+            correct=submission.correct_count - previous_correct,
+        )
+        
+        transaction.on_commit(lambda: publish_submission_event(submission, created, was_completed))
+        transaction.on_commit(lambda: StatisticsService.invalidate(question.quiz_id, question.quiz.category_id))
         return submission
     
     @staticmethod
     def get_user_submission(user, quiz_id):
         try:
-            return Submission.objects.prefetch_related('answers__question', 'answers__selected_option').get(
-                user=user, quiz_id=quiz_id
-            )
+            submission = Submission.objects.select_related('user', 'quiz').get(user=user, quiz_id=quiz_id)
         except Submission.DoesNotExist:
             return None
+        
+        SubmissionService.prefetch_answers([submission])
+        return submission
+    
+    @staticmethod
+    def prefetch_answers(submissions):
+        """Load answers with their question and option; archived ones only where a submission has some"""
+        prefetch_related_objects(submissions, Prefetch(
+            'answers', SubmissionAnswer.objects.select_related('question', 'selected_option')
+        ))
+        archived = [submission for submission in submissions if submission.has_archived_answers]
+        if archived:
+            prefetch_related_objects(archived, Prefetch(
+                'archived_answers', ArchivedSubmissionAnswer.objects.select_related('question', 'selected_option')
+            ))
     
     @staticmethod
     def get_quiz_submissions(quiz_id):
         return Submission.objects.filter(quiz_id=quiz_id).select_related('user', 'quiz')
     
+    @staticmethod
+    def get_submission_summary():
+        counts = Submission.objects.aggregate(
+            total=Count('pk'),
+            completed=Count('pk', filter=Q(is_completed=True)),
+            in_progress=Count('pk', filter=Q(is_completed=False, attempted_count__gt=0))
+        )
+        total = counts['total']
+        return {
+            "total_submissions": total,
+            "completed_submissions": counts['completed'],
+            "in_progress_submissions": counts['in_progress'],
+            "completion_rate": round((counts['completed'] / total * 100), 2) if total > 0 else 0
+        }
+    
     @staticmethod
     def get_all_submissions():
         return Submission.objects.select_related('user', 'quiz', 'quiz__category').order_by('-updated_at')
@@ -190,4 +385,944 @@ class SubmissionService:
         return {
             'attended': attended_quizzes,
             'not_attended': not_attended_quizzes
-        }
\ No newline at end of file
+        }
+
+class RegradeService:
+    DEFAULT_CHUNK_SIZE = 5000
+
+    @staticmethod
+    def _next_chunk(queryset, last_pk, chunk_size):
+        """Return the pks of the next chunk after last_pk"""
+        return list(
+            queryset.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+
+    @staticmethod
+    def _correct_count_subquery(model):
+        return Coalesce(Subquery(
+            model.objects.filter(submission_id=OuterRef('pk'), is_correct=True)
+            .order_by().values('submission_id').annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField()
+        ), 0)
+
+    @staticmethod
+    def _recount_submissions(submission_ids):
+        return Submission.objects.filter(pk__in=submission_ids).update(
+            correct_count=RegradeService._correct_count_subquery(SubmissionAnswer)
+            + RegradeService._correct_count_subquery(ArchivedSubmissionAnswer)
+        )
+
+    @staticmethod
+    def _regrade_answers(model, answers, last_pk, chunk_size, totals, progress=None):
+        option_is_correct = Option.objects.filter(pk=OuterRef('selected_option_id')).values('is_correct')[:1]
+        while True:
+            pks = RegradeService._next_chunk(answers, last_pk, chunk_size)
+            if not pks:
+                return last_pk
+
+            upper_pk = pks[-1]
+            chunk = answers.filter(pk__gt=last_pk, pk__lte=upper_pk)
+            with transaction.atomic():
+                stale = chunk.filter(~Q(is_correct=F('selected_option__is_correct')))
+                submission_ids = list(stale.values_list('submission_id', flat=True).distinct())
+                if submission_ids:
+                    totals['answers_changed'] += model.objects.filter(
+                        pk__in=stale.values('pk')
+                    ).update(is_correct=Subquery(option_is_correct))
+                    totals['submissions_updated'] += RegradeService._recount_submissions(submission_ids)
+                    UserStatsService.rebuild_users(
+                        Submission.objects.filter(pk__in=submission_ids).values_list('user_id', flat=True).distinct()
+                    )
+
+            totals['answers_scanned'] += len(pks)
+            last_pk = upper_pk
+            if progress:
+                progress(scanned=totals['answers_scanned'], answers_changed=totals['answers_changed'], last_pk=last_pk)
+
+    @staticmethod
+    def regrade(quiz_id=None, question_id=None, chunk_size=None, start_after=0, progress=None):
+        """Recompute answer correctness and submission counters against the current answer key.
+
+        Works in pk-range chunks, each in its own short transaction, so it never
+        holds locks on the whole table. Pass the returned ``last_pk`` back in as
+        ``start_after`` to resume an interrupted run; archived answers are
+        rechecked in full afterwards since only stale rows are rewritten.
+        """
+        if question_id is not None:
+            quiz_id = Question.objects.filter(id=question_id).values_list('quiz_id', flat=True).first()
+            if quiz_id is None:
+                raise ValueError("Question not found")
+            lookup = {'question_id': question_id}
+        elif quiz_id is not None:
+            if not Quiz.objects.filter(id=quiz_id).exists():
+                raise ValueError("Quiz not found")
+            lookup = {'submission__quiz_id': quiz_id}
+        else:
+            raise ValueError("Either quiz or question is required")
+
+        chunk_size = chunk_size or RegradeService.DEFAULT_CHUNK_SIZE
+        totals = {"answers_scanned": 0, "answers_changed": 0, "submissions_updated": 0}
+        last_pk = RegradeService._regrade_answers(
+            SubmissionAnswer, SubmissionAnswer.objects.filter(**lookup), start_after, chunk_size, totals, progress
+        )
+        RegradeService._regrade_answers(
+            ArchivedSubmissionAnswer, ArchivedSubmissionAnswer.objects.filter(**lookup), 0, chunk_size, totals
+        )
+        if totals['submissions_updated']:
+            StatisticsService.invalidate(quiz_id)
+        return {**totals, "last_pk": last_pk}
+
+
+class SubmissionAuditService:
+    DEFAULT_CHUNK_SIZE = 10000
+    COUNTER_FIELDS = ['attempted_count', 'correct_count', 'is_completed']
+
+    @staticmethod
+    def _question_totals(quiz_ids):
+        return dict(
+            Question.objects.filter(quiz_id__in=quiz_ids)
+            .order_by().values('quiz_id').annotate(total=Count('pk'))
+            .values_list('quiz_id', 'total')
+        )
+
+    @staticmethod
+    def find_mismatches(quiz_id_from=None, quiz_id_to=None, chunk_size=None, start_after=0):
+        """Yield (submission_id, stored, expected) for every submission whose counters have drifted.
+
+        Scans submissions in pk-range chunks, optionally limited to an
+        inclusive quiz id range, and compares them against one GROUP BY over
+        the chunk's own answers and Question per chunk.
+        """
+        submissions = Submission.objects.all()
+        if quiz_id_from is not None:
+            submissions = submissions.filter(quiz_id__gte=quiz_id_from)
+        if quiz_id_to is not None:
+            submissions = submissions.filter(quiz_id__lte=quiz_id_to)
+
+        chunk_size = chunk_size or SubmissionAuditService.DEFAULT_CHUNK_SIZE
+        last_pk = start_after
+        while True:
+            rows = list(
+                submissions.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', 'quiz_id', *SubmissionAuditService.COUNTER_FIELDS)[:chunk_size]
+            )
+            if not rows:
+                break
+
+            last_pk = rows[-1][0]
+            answer_counts = {}
+            # Filter on this chunk's own pks: with a quiz range the pk span also covers other quizzes' submissions
+            chunk_pks = [row[0] for row in rows]
+            for model in (SubmissionAnswer, ArchivedSubmissionAnswer):
+                for submission_id, attempted, correct in model.objects.filter(
+                    submission_id__in=chunk_pks
+                ).order_by().values('submission_id').annotate(
+                    attempted=Count('pk'),
+                    correct=Count('pk', filter=Q(is_correct=True))
+                ).values_list('submission_id', 'attempted', 'correct'):
+                    previous = answer_counts.get(submission_id, (0, 0))
+                    answer_counts[submission_id] = (previous[0] + attempted, previous[1] + correct)
+            totals = SubmissionAuditService._question_totals({row[1] for row in rows})
+
+            for pk, quiz_id, attempted_count, correct_count, is_completed in rows:
+                attempted, correct = answer_counts.get(pk, (0, 0))
+                expected = (attempted, correct, attempted == totals.get(quiz_id, 0))
+                stored = (attempted_count, correct_count, is_completed)
+                if stored != expected:
+                    yield pk, dict(zip(SubmissionAuditService.COUNTER_FIELDS, stored)), \
+                        dict(zip(SubmissionAuditService.COUNTER_FIELDS, expected))
+
+    @staticmethod
+    def repair(mismatches, batch_size=None):
+        """Write the expected counters back with bulk updates, returns the number of rows fixed"""
+        batch_size = batch_size or SubmissionAuditService.DEFAULT_CHUNK_SIZE
+        batch = []
+        repaired = 0
+        for pk, _, expected in mismatches:
+            batch.append(Submission(pk=pk, **expected))
+            if len(batch) >= batch_size:
+                repaired += SubmissionAuditService._write_batch(batch)
+                batch = []
+        if batch:
+            repaired += SubmissionAuditService._write_batch(batch)
+        return repaired
+
+    @staticmethod
+    def _write_batch(batch):
+        updated = Submission.objects.bulk_update(batch, SubmissionAuditService.COUNTER_FIELDS)
+        UserStatsService.rebuild_users(
+            Submission.objects.filter(pk__in=[submission.pk for submission in batch])
+            .values_list('user_id', flat=True).distinct()
+        )
+        for quiz_id, category_id in Submission.objects.filter(
+            pk__in=[submission.pk for submission in batch]
+        ).values_list('quiz_id', 'quiz__category_id').distinct():
+            StatisticsService.invalidate(quiz_id, category_id)
+        return updated
+
+
+class ArchiveService:
+    DEFAULT_CHUNK_SIZE = 5000
+    # A "month" in the age cutoff is a fixed 30 days, not a calendar month
+    DAYS_PER_MONTH = 30
+    ARCHIVE_FIELDS = ['submission_id', 'question_id', 'selected_option_id', 'is_correct', 'created_at']
+
+    @staticmethod
+    def archive_answers(older_than_months=None, inactive_quizzes=False, chunk_size=None, progress=None):
+        """Move answers for deactivated quizzes and/or older than N months into the archive table.
+
+        Submission counters are left untouched: archived rows keep counting
+        towards them and are read back through ``Submission.all_answers``.
+        """
+        if older_than_months is None and not inactive_quizzes:
+            raise ValueError("Choose an age cutoff or inactive quizzes to archive")
+
+        criteria = Q()
+        if older_than_months is not None:
+            criteria |= Q(created_at__lt=timezone.now() - timedelta(days=ArchiveService.DAYS_PER_MONTH * older_than_months))
+        if inactive_quizzes:
+            criteria |= Q(submission__quiz__is_active=False)
+        answers = SubmissionAnswer.objects.filter(criteria)
+
+        chunk_size = chunk_size or ArchiveService.DEFAULT_CHUNK_SIZE
+        archived = 0
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    answers.select_for_update(skip_locked=True, of=('self',)).order_by('pk')
+                    .values_list('pk', *ArchiveService.ARCHIVE_FIELDS)[:chunk_size]
+                )
+                if not rows:
+                    break
+
+                pks = [row[0] for row in rows]
+                ArchivedSubmissionAnswer.objects.bulk_create([
+                    ArchivedSubmissionAnswer(**dict(zip(ArchiveService.ARCHIVE_FIELDS, row[1:])))
+                    for row in rows
+                ])
+                Submission.objects.filter(
+                    pk__in={row[1] for row in rows}, has_archived_answers=False
+                ).update(has_archived_answers=True)
+                SubmissionAnswer.objects.filter(pk__in=pks).delete()
+
+            archived += len(rows)
+            if progress:
+                progress(archived=archived, last_pk=pks[-1])
+
+        return archived
+
+
+class StatisticsService:
+    PERCENTILES = [10, 25, 50, 75, 90, 99]
+
+    @staticmethod
+    def _cache_key(scope, scope_id, bins):
+        return f"score-stats:{scope}:{scope_id}:{bins}"
+
+    @staticmethod
+    def invalidate(quiz_id, category_id=None):
+        if category_id is None:
+            category_id = Quiz.objects.filter(id=quiz_id).values_list('category_id', flat=True).first()
+        keys = [StatisticsService._cache_key('quiz', quiz_id, bins) for bins in settings.SCORE_STATS_BINS]
+        keys += [StatisticsService._cache_key('category', category_id, bins) for bins in settings.SCORE_STATS_BINS]
+        cache.delete_many(keys)
+
+    @staticmethod
+    def _summarize_numpy(rows, bins):
+        counts = np.fromiter(chain.from_iterable(rows), dtype=np.float64, count=3 * len(rows)).reshape(-1, 3)
+        counts = counts[counts[:, 1] > 0]
+        scores = np.repeat(counts[:, 0] / counts[:, 1] * 100, counts[:, 2].astype(np.int64))
+        if not scores.size:
+            return None
+        histogram, _ = np.histogram(scores, bins=bins, range=(0, 100))
+        percentiles = np.percentile(scores, StatisticsService.PERCENTILES)
+        return {
+            "count": int(scores.size),
+            "mean": float(scores.mean()),
+            "median": float(np.median(scores)),
+            "std": float(scores.std()),
+            "min": float(scores.min()),
+            "max": float(scores.max()),
+            "percentiles": dict(zip(StatisticsService.PERCENTILES, percentiles.tolist())),
+            "histogram": histogram.tolist(),
+        }
+
+    @staticmethod
+    def _summarize_python(rows, bins):
+        scores = sorted(chain.from_iterable(
+            [correct / attempted * 100] * total for correct, attempted, total in rows if attempted > 0
+        ))
+        if not scores:
+            return None
+
+        def percentile(p):
+            # Linear interpolation between closest ranks, the same as numpy's default
+            position = p / 100 * (len(scores) - 1)
+            lower = math.floor(position)
+            upper = min(lower + 1, len(scores) - 1)
+            return scores[lower] + (scores[upper] - scores[lower]) * (position - lower)
+
+        histogram = [0] * bins
+        for score in scores:
+            histogram[min(int(score * bins / 100), bins - 1)] += 1
+        return {
+            "count": len(scores),
+            "mean": statistics.fmean(scores),
+            "median": statistics.median(scores),
+            "std": statistics.pstdev(scores),
+            "min": scores[0],
+            "max": scores[-1],
+            "percentiles": {p: percentile(p) for p in StatisticsService.PERCENTILES},
+            "histogram": histogram,
+        }
+
+    @staticmethod
+    def get_score_statistics(quiz_id=None, category_id=None, bins=10):
+        """Score percentage distribution over submissions with at least one answer, cached per quiz or category"""
+        if bins not in settings.SCORE_STATS_BINS:
+            raise ValueError(f"bins must be one of {settings.SCORE_STATS_BINS}")
+        if quiz_id is not None:
+            scope, scope_id, submissions = 'quiz', quiz_id, Submission.objects.filter(quiz_id=quiz_id)
+        else:
+            scope, scope_id, submissions = 'category', category_id, Submission.objects.filter(quiz__category_id=category_id)
+
+        key = StatisticsService._cache_key(scope, scope_id, bins)
+        result = cache.get(key)
+        if result is None:
+            # Submissions share few distinct (correct, attempted) pairs, so let the database
+            # collapse them and expand the weighted pairs into a flat score array here
+            rows = list(
+                submissions.filter(attempted_count__gt=0).order_by()
+                .values_list('correct_count', 'attempted_count').annotate(total=Count('pk'))
+            )
+            summarize = StatisticsService._summarize_numpy if np is not None else StatisticsService._summarize_python
+            summary = summarize(rows, bins) or {"count": 0}
+            if "histogram" in summary:
+                width = 100 / bins
+                summary["histogram"] = [
+                    {"from": round(i * width, 2), "to": round((i + 1) * width, 2), "count": count}
+                    for i, count in enumerate(summary["histogram"])
+                ]
+                summary["percentiles"] = {f"p{p}": round(value, 2) for p, value in summary["percentiles"].items()}
+                for field in ("mean", "median", "std", "min", "max"):
+                    summary[field] = round(summary[field], 2)
+            result = {scope: scope_id, **summary}
+            cache.set(key, result, settings.SCORE_STATS_CACHE_SECONDS)
+        return result
+
+
+class PurgeService:
+    DEFAULT_BATCH_SIZE = 2000
+    # Dependents of one quiz, deleted bottom-up so no batch ever needs Django's cascade collector
+    QUIZ_STEPS = [
+        ('archived_answers', ArchivedSubmissionAnswer, 'submission__quiz_id'),
+        ('answers', SubmissionAnswer, 'submission__quiz_id'),
+        ('submissions', Submission, 'quiz_id'),
+        ('options', Option, 'question__quiz_id'),
+        ('questions', Question, 'quiz_id'),
+        ('quizzes', Quiz, 'id'),
+    ]
+
+    @staticmethod
+    def request_purge(target, target_id, user=None):
+        """Hide a category or quiz right away and queue the actual deletion"""
+        model = Category if target == 'category' else Quiz
+        with transaction.atomic():
+            if not model.objects.filter(id=target_id, is_deleted=False).update(is_deleted=True):
+                raise ValueError(f"{model.__name__} not found")
+            quizzes = Quiz.objects.filter(category_id=target_id) if target == 'category' else Quiz.objects.filter(id=target_id)
+            quizzes.update(is_deleted=True, is_active=False)
+            hidden = list(quizzes.values_list('id', 'category_id'))
+            quiz_ids = [quiz_id for quiz_id, _ in hidden]
+            # Hidden quizzes stop counting towards their students' stats right away
+            user_ids = list(Submission.objects.filter(quiz_id__in=quiz_ids).values_list('user_id', flat=True).distinct())
+            transaction.on_commit(lambda: QuestionService.invalidate_question_ids(
+                quiz_ids=quiz_ids,
+                category_ids={category_id for _, category_id in hidden}
+            ))
+            transaction.on_commit(lambda: UserStatsService.rebuild_users(user_ids))
+            return PurgeJob.objects.create(target=target, target_id=target_id, created_by=user)
+
+    @staticmethod
+    def _delete_in_batches(job, step, model, lookup, quiz_id, batch_size, progress=None):
+        queryset = model.objects.filter(**{lookup: quiz_id})
+        while True:
+            pks = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                return
+            with transaction.atomic():
+                # Everything referencing these rows is already gone, so a plain DELETE is safe
+                deleted = model.objects.filter(pk__in=pks)._raw_delete(model.objects.db)
+                job.deleted_counts[step] = job.deleted_counts.get(step, 0) + deleted
+                job.save(update_fields=['deleted_counts', 'updated_at'])
+            if progress:
+                progress(job=job, step=step, deleted=job.deleted_counts[step])
+
+    @staticmethod
+    def _claimable():
+        # A running job whose worker stopped saving progress is taken over after PURGE_JOB_STALE_SECONDS
+        stale = timezone.now() - timedelta(seconds=settings.PURGE_JOB_STALE_SECONDS)
+        return Q(status__in=['pending', 'failed']) | Q(status='running', updated_at__lt=stale)
+
+    @staticmethod
+    def claim_job(job):
+        """Mark the job running unless another worker holds it; a single conditional UPDATE"""
+        claimed = PurgeJob.objects.filter(PurgeService._claimable(), pk=job.pk).update(
+            status='running', error='', updated_at=timezone.now()
+        )
+        if claimed:
+            job.refresh_from_db()
+        return bool(claimed)
+
+    @staticmethod
+    def run_job(job, batch_size=None, progress=None):
+        """Delete everything under the job's target; safe to call again after a crash.
+
+        Returns None without doing anything when another worker holds the job.
+        """
+        batch_size = batch_size or PurgeService.DEFAULT_BATCH_SIZE
+        if not PurgeService.claim_job(job):
+            return None
+        try:
+            if job.target == 'category':
+                quizzes = list(Quiz.objects.filter(category_id=job.target_id).values_list('id', 'category_id'))
+            else:
+                category_id = Quiz.objects.filter(id=job.target_id).values_list('category_id', flat=True).first()
+                quizzes = [(job.target_id, category_id)]
+
+            for quiz_id, category_id in quizzes:
+                # Later versions outlive the quiz they were cloned from
+                Quiz.objects.filter(parent_id=quiz_id).update(parent=None)
+                for step, model, lookup in PurgeService.QUIZ_STEPS:
+                    PurgeService._delete_in_batches(job, step, model, lookup, quiz_id, batch_size, progress)
+                StatisticsService.invalidate(quiz_id, category_id)
+
+            if job.target == 'category':
+                PurgeService._delete_in_batches(
+                    job, 'user_stats', UserCategoryStats, 'category_id', job.target_id, batch_size, progress
+                )
+                PurgeService._delete_in_batches(job, 'categories', Category, 'id', job.target_id, batch_size, progress)
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+            job.save(update_fields=['status', 'error', 'updated_at'])
+            raise
+
+        job.status = 'done'
+        job.save(update_fields=['status', 'updated_at'])
+        return job
+
+    @staticmethod
+    def get_unfinished_jobs():
+        """Jobs a worker may claim: queued, failed, or running without progress for too long"""
+        return PurgeJob.objects.filter(PurgeService._claimable()).order_by('created_at')
+
+
+class AnswerLogService:
+    DEFAULT_CHUNK_SIZE = 50000
+    EVENT_FIELDS = ('id', 'submission_id', 'question_id', 'option_id', 'is_correct')
+
+    @staticmethod
+    def append(submission, question, option):
+        # A single narrow insert with one index to maintain; no reads on the grading path
+        return AnswerEvent.objects.create(
+            user_id=submission.user_id,
+            quiz_id=question.quiz_id,
+            submission_id=submission.id,
+            question_id=question.id,
+            option_id=option.id,
+            is_correct=option.is_correct,
+        )
+
+    @staticmethod
+    def get_history(submission_id):
+        return AnswerEvent.objects.filter(submission_id=submission_id).order_by('id')
+
+    @staticmethod
+    def _scope(quiz_id=None, submission_ids=None):
+        queryset = AnswerEvent.objects.all()
+        if quiz_id is not None:
+            queryset = queryset.filter(quiz_id=quiz_id)
+        if submission_ids is not None:
+            queryset = queryset.filter(submission_id__in=submission_ids)
+        return queryset
+
+    @staticmethod
+    def _cutoff(until=None, until_sequence=None):
+        """Events recorded at or before the cut-off; an empty Q when there is none"""
+        cutoff = Q()
+        if until is not None:
+            cutoff &= Q(created_at__lte=until)
+        if until_sequence is not None:
+            cutoff &= Q(id__lte=until_sequence)
+        return cutoff
+
+    @staticmethod
+    def iter_events(until=None, until_sequence=None, quiz_id=None, submission_ids=None,
+                    start_after=0, chunk_size=None):
+        """Yield (sequence, submission_id, question_id, option_id, is_correct) in log order"""
+        chunk_size = chunk_size or AnswerLogService.DEFAULT_CHUNK_SIZE
+        queryset = AnswerLogService._scope(quiz_id, submission_ids).filter(
+            AnswerLogService._cutoff(until, until_sequence)
+        )
+
+        last_pk = start_after
+        while True:
+            rows = list(
+                queryset.filter(id__gt=last_pk).order_by('id').values_list(*AnswerLogService.EVENT_FIELDS)[:chunk_size]
+            )
+            if not rows:
+                return
+            yield from rows
+            last_pk = rows[-1][0]
+
+    @staticmethod
+    def replay(chunk_size=None, progress=None, **filters):
+        """Fold the log into {submission_id: {question_id: (option_id, is_correct)}}
+
+        Later events for the same question overwrite earlier ones, exactly as
+        submit_answer does, so the result is the answer state as of the cut-off.
+        Submissions in scope whose every event comes after the cut-off map to
+        an empty dict: they had no answers yet at that point. The is_correct
+        flag is the grading recorded at submission time, kept as history.
+        """
+        state = {}
+        replayed = 0
+        for _, submission_id, question_id, option_id, is_correct in AnswerLogService.iter_events(
+            chunk_size=chunk_size, **filters
+        ):
+            answers = state.get(submission_id)
+            if answers is None:
+                answers = state[submission_id] = {}
+            answers[question_id] = (option_id, is_correct)
+            replayed += 1
+            if progress and replayed % (chunk_size or AnswerLogService.DEFAULT_CHUNK_SIZE) == 0:
+                progress(events=replayed, submissions=len(state))
+
+        cutoff = AnswerLogService._cutoff(filters.get('until'), filters.get('until_sequence'))
+        if cutoff:
+            later = AnswerLogService._scope(filters.get('quiz_id'), filters.get('submission_ids')).exclude(cutoff)
+            for submission_id in later.order_by().values_list('submission_id', flat=True).distinct():
+                state.setdefault(submission_id, {})
+        return state, replayed
+
+    @staticmethod
+    def apply(state, batch_size=None, progress=None):
+        """Overwrite SubmissionAnswer rows and counters with a replayed state
+
+        Only submissions present in the log are touched; answers that predate
+        the log should be seeded with backfill() first. Answers are graded
+        against the current answer key, so a replay keeps earlier regrades;
+        answers whose option has since been deleted are dropped.
+        """
+        batch_size = batch_size or 1000
+        submission_ids = sorted(state)
+        updated = 0
+        for start in range(0, len(submission_ids), batch_size):
+            batch_ids = submission_ids[start:start + batch_size]
+            with transaction.atomic():
+                submissions = list(Submission.objects.select_for_update().filter(id__in=batch_ids))
+                quiz_ids = {s.quiz_id for s in submissions}
+                question_totals = dict(
+                    Question.objects.filter(quiz_id__in=quiz_ids)
+                    .values('quiz_id').annotate(total=Count('id')).values_list('quiz_id', 'total')
+                )
+                answer_key = {
+                    option_id: (question_id, is_correct)
+                    for option_id, question_id, is_correct in Option.objects.filter(
+                        question__quiz_id__in=quiz_ids
+                    ).values_list('id', 'question_id', 'is_correct')
+                }
+                ArchivedSubmissionAnswer.objects.filter(submission_id__in=batch_ids)._raw_delete(
+                    ArchivedSubmissionAnswer.objects.db
+                )
+                SubmissionAnswer.objects.filter(submission_id__in=batch_ids)._raw_delete(SubmissionAnswer.objects.db)
+
+                answers = []
+                for submission in submissions:
+                    replayed = [
+                        SubmissionAnswer(
+                            submission_id=submission.id,
+                            question_id=question_id,
+                            selected_option_id=option_id,
+                            is_correct=answer_key[option_id][1],
+                        )
+                        for question_id, (option_id, _) in state[submission.id].items()
+                        if answer_key.get(option_id, (None,))[0] == question_id
+                    ]
+                    answers.extend(replayed)
+                    submission.attempted_count = len(replayed)
+                    submission.correct_count = sum(1 for answer in replayed if answer.is_correct)
+                    is_completed = submission.attempted_count == question_totals.get(submission.quiz_id, 0)
+                    if is_completed != submission.is_completed:
+                        submission.completed_at = timezone.now() if is_completed else None
+                    submission.is_completed = is_completed
+                    submission.has_archived_answers = False
+
+                SubmissionAnswer.objects.bulk_create(answers, batch_size=batch_size)
+                Submission.objects.bulk_update(
+                    submissions,
+                    ['attempted_count', 'correct_count', 'is_completed', 'completed_at', 'has_archived_answers'],
+                )
+            updated += len(submissions)
+            UserStatsService.rebuild_users({s.user_id for s in submissions})
+            for quiz_id, category_id in Quiz.objects.filter(
+                id__in={s.quiz_id for s in submissions}
+            ).values_list('id', 'category_id'):
+                StatisticsService.invalidate(quiz_id, category_id)
+            if progress:
+                progress(submissions=updated)
+        return updated
+
+    @staticmethod
+    def backfill(chunk_size=None, progress=None):
+        """Seed the log from answers recorded before it existed, once per submission
+
+        Meant to run once right after the log is deployed: submissions that
+        already had events when the backfill started are left alone.
+        """
+        chunk_size = chunk_size or RegradeService.DEFAULT_CHUNK_SIZE
+        high_water = AnswerEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        logged = AnswerEvent.objects.filter(submission_id=OuterRef('submission_id'), id__lte=high_water)
+        created = 0
+        for model in (ArchivedSubmissionAnswer, SubmissionAnswer):
+            answers = model.objects.exclude(Exists(logged)).values_list(
+                'id', 'submission__user_id', 'submission__quiz_id', 'submission_id',
+                'question_id', 'selected_option_id', 'is_correct', 'created_at'
+            )
+            last_pk = 0
+            while True:
+                rows = list(answers.filter(id__gt=last_pk).order_by('id')[:chunk_size])
+                if not rows:
+                    break
+                AnswerEvent.objects.bulk_create([
+                    AnswerEvent(
+                        user_id=user_id, quiz_id=quiz_id, submission_id=submission_id, question_id=question_id,
+                        option_id=option_id, is_correct=is_correct, created_at=created_at,
+                    )
+                    for _, user_id, quiz_id, submission_id, question_id, option_id, is_correct, created_at in rows
+                ])
+                created += len(rows)
+                last_pk = rows[-1][0]
+                if progress:
+                    progress(events=created)
+        return created
+
+
+class UserStatsService:
+    DEFAULT_CHUNK_SIZE = 1000
+
+    @staticmethod
+    def _streak_after(today):
+        # Evaluated against the row's old values inside a single UPDATE
+        return Case(
+            When(last_activity_date=today, then=F('current_streak')),
+            When(last_activity_date=today - timedelta(days=1), then=F('current_streak') + 1),
+            default=Value(1),
+        )
+
+    @staticmethod
+    def record(user_id, category_id, started=0, completed=0, attempted=0, correct=0):
+        """Apply one answer's deltas to the user's category row and overall row"""
+        today = timezone.localdate()
+        streak = UserStatsService._streak_after(today)
+        changes = {
+            'quizzes_started': F('quizzes_started') + started,
+            'quizzes_completed': F('quizzes_completed') + completed,
+            'questions_attempted': F('questions_attempted') + attempted,
+            'correct_answers': F('correct_answers') + correct,
+            'current_streak': streak,
+            'longest_streak': Greatest('longest_streak', streak),
+            'last_activity_date': today,
+            'updated_at': timezone.now(),
+        }
+        rows = UserCategoryStats.objects.filter(Q(category_id=category_id) | Q(category__isnull=True), user_id=user_id)
+        if rows.update(**changes) == 2:
+            return
+
+        # First activity for this user or category
+        missing = {category_id, None} - set(rows.values_list('category_id', flat=True))
+        for missing_category_id in missing:
+            try:
+                with transaction.atomic():
+                    UserCategoryStats.objects.create(
+                        user_id=user_id,
+                        category_id=missing_category_id,
+                        quizzes_started=max(started, 0),
+                        quizzes_completed=max(completed, 0),
+                        questions_attempted=max(attempted, 0),
+                        correct_answers=max(correct, 0),
+                        current_streak=1,
+                        longest_streak=1,
+                        last_activity_date=today,
+                    )
+            except IntegrityError:
+                # A concurrent request created it first
+                UserCategoryStats.objects.filter(user_id=user_id, category_id=missing_category_id).update(**changes)
+
+    @staticmethod
+    def get_user_stats(user):
+        rows = list(UserCategoryStats.objects.filter(user=user).select_related('category'))
+        overall = next((row for row in rows if row.category_id is None), None)
+        categories = sorted(
+            (row for row in rows if row.category_id is not None),
+            key=lambda row: (UserStatsService.average_score(row), row.quizzes_completed),
+            reverse=True,
+        )
+        return overall, categories
+
+    @staticmethod
+    def average_score(row):
+        if not row.questions_attempted:
+            return 0
+        return round(row.correct_answers / row.questions_attempted * 100, 2)
+
+    @staticmethod
+    def active_streak(row):
+        # A streak that was not continued yesterday or today has ended
+        if not row.last_activity_date or row.last_activity_date < timezone.localdate() - timedelta(days=1):
+            return 0
+        return row.current_streak
+
+    @staticmethod
+    def _streaks(days):
+        """(run ending on the latest day, longest run) for a set of dates"""
+        longest = run = 0
+        previous = None
+        for day in sorted(days):
+            run = run + 1 if previous and day - previous == timedelta(days=1) else 1
+            longest = max(longest, run)
+            previous = day
+        return run, longest
+
+    @staticmethod
+    def _rebuild_users(user_ids):
+        totals = {}
+        for user_id, category_id, started, completed, attempted, correct, last_updated in (
+            Submission.objects.filter(user_id__in=user_ids, quiz__is_deleted=False)
+            .values('user_id', 'quiz__category_id')
+            .annotate(
+                started=Count('id'),
+                completed=Count('id', filter=Q(is_completed=True)),
+                attempted=Sum('attempted_count'),
+                correct=Sum('correct_count'),
+                last_updated=Max('updated_at'),
+            )
+            .values_list('user_id', 'quiz__category_id', 'started', 'completed', 'attempted', 'correct', 'last_updated')
+        ):
+            last_day = timezone.localdate(last_updated)
+            for key in ((user_id, category_id), (user_id, None)):
+                row = totals.setdefault(key, [0, 0, 0, 0, set()])
+                row[0] += started
+                row[1] += completed
+                row[2] += attempted
+                row[3] += correct
+                row[4].add(last_day)
+
+        # Activity days come from the answer log when it covers the user
+        events = list(
+            AnswerEvent.objects.filter(user_id__in=user_ids)
+            .annotate(day=TruncDate('created_at'))
+            .values_list('user_id', 'quiz_id', 'day')
+            .distinct()
+        )
+        quiz_categories = dict(
+            Quiz.objects.filter(id__in={quiz_id for _, quiz_id, _ in events}).values_list('id', 'category_id')
+        )
+        logged_days = {}
+        for user_id, quiz_id, day in events:
+            logged_days.setdefault((user_id, None), set()).add(day)
+            if quiz_id in quiz_categories:
+                logged_days.setdefault((user_id, quiz_categories[quiz_id]), set()).add(day)
+
+        rows = []
+        for (user_id, category_id), (started, completed, attempted, correct, days) in totals.items():
+            days = logged_days.get((user_id, category_id)) or days
+            current, longest = UserStatsService._streaks(days)
+            rows.append(UserCategoryStats(
+                user_id=user_id,
+                category_id=category_id,
+                quizzes_started=started,
+                quizzes_completed=completed,
+                questions_attempted=attempted,
+                correct_answers=correct,
+                current_streak=current,
+                longest_streak=longest,
+                last_activity_date=max(days),
+            ))
+        return rows
+
+    @staticmethod
+    def rebuild_users(user_ids):
+        """Recompute the stats rows of the given users from their submissions.
+
+        Called by regrade, counter repair, log replay and purges, which change
+        scores without going through submit_answer. Works through the users in
+        chunks of DEFAULT_CHUNK_SIZE, one transaction each.
+        """
+        user_ids = list(user_ids)
+        for start in range(0, len(user_ids), UserStatsService.DEFAULT_CHUNK_SIZE):
+            chunk = user_ids[start:start + UserStatsService.DEFAULT_CHUNK_SIZE]
+            with transaction.atomic():
+                # Hold the existing rows so live updates wait for the rebuilt ones
+                list(UserCategoryStats.objects.select_for_update().filter(user_id__in=chunk).values_list('id'))
+                UserCategoryStats.objects.filter(user_id__in=chunk).delete()
+                UserCategoryStats.objects.bulk_create(UserStatsService._rebuild_users(chunk))
+
+    @staticmethod
+    def rebuild(user_id_from=None, user_id_to=None, chunk_size=None, progress=None):
+        """Recompute stats from submissions for a user id range, one transaction per chunk of users"""
+        chunk_size = chunk_size or UserStatsService.DEFAULT_CHUNK_SIZE
+        users = User.objects.all()
+        if user_id_to is not None:
+            users = users.filter(id__lte=user_id_to)
+
+        last_pk = user_id_from - 1 if user_id_from is not None else 0
+        rebuilt = 0
+        while True:
+            user_ids = list(users.filter(id__gt=last_pk).order_by('id').values_list('id', flat=True)[:chunk_size])
+            if not user_ids:
+                return rebuilt
+            UserStatsService.rebuild_users(user_ids)
+            rebuilt += len(user_ids)
+            last_pk = user_ids[-1]
+            if progress:
+                progress(users=rebuilt, last_pk=last_pk)
+
+
+class RollupService:
+    PERIODS = ('hour', 'day')
+    METRICS = ('attempts', 'correct_answers', 'completions', 'active_users')
+
+    @staticmethod
+    def floor(moment, period):
+        """Start of the local-time hour or day containing moment"""
+        moment = timezone.localtime(moment)
+        if period == 'hour':
+            return moment.replace(minute=0, second=0, microsecond=0)
+        return timezone.make_aware(datetime.combine(moment.date(), time.min))
+
+    @staticmethod
+    def next_bucket(bucket_start, period):
+        if period == 'hour':
+            return timezone.localtime(bucket_start + timedelta(hours=1))
+        return timezone.make_aware(datetime.combine(timezone.localtime(bucket_start).date() + timedelta(days=1), time.min))
+
+    @staticmethod
+    def build_bucket(period, bucket_start):
+        """Recompute every rollup row of one closed bucket from the answer log and completions"""
+        bucket_end = RollupService.next_bucket(bucket_start, period)
+        events = AnswerEvent.objects.filter(created_at__gte=bucket_start, created_at__lt=bucket_end).annotate(
+            category_id=Subquery(Quiz.objects.filter(id=OuterRef('quiz_id')).values('category_id')[:1])
+        ).exclude(category_id__isnull=True)
+        activity = {
+            'attempts': Count('id'),
+            'correct_answers': Count('id', filter=Q(is_correct=True)),
+            'active_users': Count('user_id', distinct=True),
+        }
+        completed = Submission.objects.filter(completed_at__gte=bucket_start, completed_at__lt=bucket_end)
+
+        rows = {}
+        for values in chain(
+            events.values('category_id', 'quiz_id').annotate(**activity),
+            events.values('category_id').annotate(**activity),
+        ):
+            rows[(values['category_id'], values.get('quiz_id'))] = {
+                metric: values[metric] for metric in activity
+            }
+        for values in chain(
+            completed.values('quiz__category_id', 'quiz_id').annotate(completions=Count('id')),
+            completed.values('quiz__category_id').annotate(completions=Count('id')),
+        ):
+            key = (values['quiz__category_id'], values.get('quiz_id'))
+            rows.setdefault(key, {})['completions'] = values['completions']
+
+        with transaction.atomic():
+            ActivityRollup.objects.filter(period=period, bucket_start=bucket_start).delete()
+            ActivityRollup.objects.bulk_create([
+                ActivityRollup(period=period, bucket_start=bucket_start, category_id=category_id, quiz_id=quiz_id,
+                               **metrics)
+                for (category_id, quiz_id), metrics in rows.items()
+            ])
+        return len(rows)
+
+    @staticmethod
+    def run_incremental(now=None, progress=None):
+        """Build every bucket that has closed since each period's watermark
+
+        Buckets only count as closed ROLLUP_LAG_SECONDS after they end, so
+        answers committed a little late still land in the right bucket.
+        """
+        horizon = (now or timezone.now()) - timedelta(seconds=settings.ROLLUP_LAG_SECONDS)
+        built = dict.fromkeys(RollupService.PERIODS, 0)
+        for period in RollupService.PERIODS:
+            watermark = RollupWatermark.objects.filter(period=period).first()
+            if watermark:
+                bucket_start = timezone.localtime(watermark.processed_until)
+            else:
+                first_event = AnswerEvent.objects.order_by('created_at').values_list('created_at', flat=True).first()
+                if first_event is None:
+                    continue
+                bucket_start = RollupService.floor(first_event, period)
+
+            horizon_bucket = RollupService.floor(horizon, period)
+            while bucket_start < horizon_bucket:
+                bucket_end = RollupService.next_bucket(bucket_start, period)
+                with transaction.atomic():
+                    RollupService.build_bucket(period, bucket_start)
+                    RollupWatermark.objects.update_or_create(period=period, defaults={'processed_until': bucket_end})
+                built[period] += 1
+                bucket_start = bucket_end
+                if progress:
+                    progress(period=period, bucket_start=bucket_start)
+        return built
+
+    @staticmethod
+    def backfill(first_day, last_day, progress=None):
+        """Rebuild the day bucket and hour buckets of every local date from first_day to last_day"""
+        built = 0
+        day = first_day
+        while day <= last_day:
+            day_start = timezone.make_aware(datetime.combine(day, time.min))
+            RollupService.build_bucket('day', day_start)
+            hour_start = day_start
+            day_end = RollupService.next_bucket(day_start, 'day')
+            while hour_start < day_end:
+                RollupService.build_bucket('hour', hour_start)
+                hour_start = RollupService.next_bucket(hour_start, 'hour')
+            built += 1
+            if progress:
+                progress(day=day)
+            day += timedelta(days=1)
+        return built
+
+    @staticmethod
+    def advance_watermarks(first_day, until_day):
+        """Move watermarks past a finished backfill as long as that leaves no unbuilt gap behind them"""
+        backfill_start = timezone.make_aware(datetime.combine(first_day, time.min))
+        until = timezone.make_aware(datetime.combine(until_day, time.min))
+        for period in RollupService.PERIODS:
+            watermark = RollupWatermark.objects.filter(period=period).first()
+            if watermark is None:
+                RollupWatermark.objects.create(period=period, processed_until=until)
+            elif backfill_start <= watermark.processed_until < until:
+                watermark.processed_until = until
+                watermark.save(update_fields=['processed_until', 'updated_at'])
+
+    @staticmethod
+    def get_report(period, start, end, category_id=None, quiz_id=None):
+        """Rollup rows for buckets starting in [start, end); reads nothing but the rollup tables"""
+        rows = ActivityRollup.objects.filter(period=period, bucket_start__gte=start, bucket_start__lt=end)
+        if quiz_id is not None:
+            rows = rows.filter(quiz_id=quiz_id)
+        else:
+            rows = rows.filter(quiz_id__isnull=True)
+            if category_id is not None:
+                rows = rows.filter(category_id=category_id)
+        watermark = RollupWatermark.objects.filter(period=period).values_list('processed_until', flat=True).first()
+        return {
+            'processed_until': watermark,
+            'rows': list(rows.order_by('bucket_start', 'category_id').values(
+                'bucket_start', 'category_id', 'quiz_id', *RollupService.METRICS
+            )),
+        }
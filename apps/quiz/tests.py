@@ -1,3 +1,1064 @@
-from django.test import TestCase
+import asyncio
+import json
+import random
+import tempfile
+import warnings
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core.management import call_command
+from django.contrib import admin
+from django.core.cache import cache, caches
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connection, connections, transaction
+from django.db.models import Case, When
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.users.models import User
+from .models import (
+    Category, Quiz, Question, Option, Submission, SubmissionAnswer, ArchivedSubmissionAnswer, PurgeJob, AnswerEvent,
+    UserCategoryStats, ActivityRollup, RollupWatermark
+)
+from .events import InProcessBroker, encode_event, issue_stream_token, publish_submission_event
+from .services import (
+    AnswerLogService, ArchiveService, PurgeService, QuestionService, QuizService, RegradeService, RollupService,
+    StatisticsService, SubmissionService, SubmissionAuditService
+)
+from . import services
+from utlis import admission, db_router, profiling
+from utlis.admin import ScalableAdminMixin
+from utlis.compression import CompressionMiddleware, negotiate_encoding
+from utlis.query_inspection import NPlusOneDetected, QueryBudgetExceeded, detect_queries
+from utlis.schema import _load_schema, cached_schema_view
+
+
+class QuizTestCase(TestCase):
+    """A category with one quiz of three questions; the first option of each question is correct"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', role='ADMIN')
+        cls.category = Category.objects.create(name='category')
+        cls.quiz = cls.make_quiz('quiz')
+
+    @classmethod
+    def make_quiz(cls, title, questions=3, category=None):
+        quiz = Quiz.objects.create(title=title, category=category or cls.category, created_by=cls.admin)
+        for i in range(questions):
+            QuestionService.create_question_with_options(
+                quiz.id, f'{title} question {i}', [{'text': 'right', 'is_correct': True}, {'text': 'wrong'}]
+            )
+        return quiz
+
+    @staticmethod
+    def answer(user, question, correct=True):
+        option = question.options.get(is_correct=correct)
+        return SubmissionService.submit_answer(user, question.id, option.id)
+
+
+class SubmissionAuditTests(QuizTestCase):
+    def test_quiz_range_only_aggregates_its_own_submissions(self):
+        other = self.make_quiz('other')
+        # Interleave the two quizzes' submissions so their pk ranges overlap
+        for i in range(4):
+            user = User.objects.create(username=f'student {i}')
+            for quiz in (self.quiz, other):
+                self.answer(user, quiz.questions.first())
+        own = set(Submission.objects.filter(quiz=self.quiz).values_list('pk', flat=True))
+        Submission.objects.filter(pk=min(own)).update(correct_count=0)
+
+        answer_table = SubmissionAnswer._meta.db_table
+        aggregate_params = []
+
+        def capture(execute, sql, params, many, context):
+            if f'FROM "{answer_table}"' in sql:
+                aggregate_params.append(set(params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(capture):
+            mismatches = list(SubmissionAuditService.find_mismatches(self.quiz.id, self.quiz.id))
+
+        self.assertEqual([pk for pk, _, _ in mismatches], [min(own)])
+        # The answer aggregate reads exactly this quiz's submissions, not the pk span they fall in
+        self.assertEqual(aggregate_params, [own])
+
+
+class IdempotentSubmitTests(QuizTestCase):
+    def setUp(self):
+        caches[settings.IDEMPOTENCY_CACHE].clear()
+        self.student = User.objects.create(username='student')
+        self.auth = f'Bearer {RefreshToken.for_user(self.student).access_token}'
+        # One token and practically no refill, so the second request in a row is shed
+        self.controller = admission.AdmissionController(global_rate=0.001, global_burst=1)
+        patcher = mock.patch.dict(admission._controllers, {'grading': self.controller})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def submit(self, question, key):
+        option = question.options.get(is_correct=True)
+        return self.client.post(
+            '/api/quiz/submit-answer/', {'question_id': question.id, 'option_id': option.id},
+            content_type='application/json', HTTP_AUTHORIZATION=self.auth, HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_retry_after_shed_request_is_executed(self):
+        first, second = self.quiz.questions.order_by('id')[:2]
+        self.assertEqual(self.submit(first, 'k1').status_code, 200)
+
+        shed = self.submit(second, 'k2')
+        self.assertEqual(shed.status_code, 429)
+        self.assertIn('Retry-After', shed)
+
+        self.controller.global_bucket.tokens = 1
+        retry = self.submit(second, 'k2')
+        self.assertEqual(retry.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', retry)
+        self.assertEqual(SubmissionAnswer.objects.filter(submission__user=self.student).count(), 2)
+
+        # The successful response is the one kept for later replays
+        replay = self.submit(second, 'k2')
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(replay.content, retry.content)
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """Runs against the ``replica_1`` mirror from config.settings.test"""
+
+    databases = {DEFAULT_DB_ALIAS, 'replica_1'}
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create(username='admin', role='ADMIN')
+        self.auth = f'Bearer {RefreshToken.for_user(self.admin).access_token}'
+        self.quiz = Quiz.objects.create(title='quiz', category=Category.objects.create(name='category'),
+                                        created_by=self.admin)
+        question = QuestionService.create_question_with_options(
+            self.quiz.id, 'question', [{'text': 'right', 'is_correct': True}, {'text': 'wrong'}]
+        )
+        SubmissionService.submit_answer(User.objects.create(username='student'), question.id,
+                                        question.options.get(is_correct=True).id)
+
+    def request(self, method, path):
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary, \
+                CaptureQueriesContext(connections['replica_1']) as replica:
+            response = getattr(self.client, method)(path, HTTP_AUTHORIZATION=self.auth)
+        self.assertEqual(response.status_code, 200)
+        return response, primary, replica
+
+    def read_submissions(self):
+        return self.request('get', f'/api/quiz/quizzes/{self.quiz.id}/submissions/')
+
+    def test_router(self):
+        router = db_router.PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_read(Quiz), DEFAULT_DB_ALIAS)
+        token = db_router._use_replica.set(True)
+        try:
+            self.assertEqual(router.db_for_read(Quiz), 'replica_1')
+            self.assertEqual(router.db_for_write(Quiz), DEFAULT_DB_ALIAS)
+        finally:
+            db_router._use_replica.reset(token)
+
+    def test_opted_in_view_reads_from_the_replica(self):
+        response, primary, replica = self.read_submissions()
+        self.assertEqual(len(response.json()['data']), 1)
+        self.assertTrue(any('quiz_submission' in query['sql'] for query in replica))
+        self.assertFalse(any('quiz_submission' in query['sql'] for query in primary))
+
+    def test_writes_go_to_the_primary_and_pin_the_user(self):
+        _, primary, replica = self.request('patch', f'/api/quiz/quizzes/{self.quiz.id}/toggle-status/')
+        self.assertTrue(any(query['sql'].startswith('UPDATE') for query in primary))
+        self.assertFalse(any(not query['sql'].startswith('SELECT') for query in replica))
+
+        # Within the pin window the writer reads its own write from the primary
+        response, primary, replica = self.read_submissions()
+        self.assertEqual(len(replica), 0)
+        self.assertTrue(any('quiz_submission' in query['sql'] for query in primary))
+
+        # Once the window has passed, reads go back to the replica
+        cache.delete(db_router._pin_key(self.admin.pk))
+        _, _, replica = self.read_submissions()
+        self.assertTrue(any('quiz_submission' in query['sql'] for query in replica))
+
+    def test_routing_does_not_leak_past_the_request(self):
+        self.read_submissions()
+        self.assertFalse(db_router._use_replica.get())
+        self.assertEqual(db_router.PrimaryReplicaRouter().db_for_read(Quiz), DEFAULT_DB_ALIAS)
+
+
+class EventBrokerTests(SimpleTestCase):
+    async def test_publish_reaches_subscribers_until_they_unsubscribe(self):
+        broker = InProcessBroker()
+        first, second = broker.subscribe(), broker.subscribe()
+        broker.publish(b'one')
+        await asyncio.sleep(0)
+        self.assertEqual(await first.get(), b'one')
+        self.assertEqual(await second.get(), b'one')
+
+        broker.unsubscribe(second)
+        broker.publish(b'two')
+        await asyncio.sleep(0)
+        self.assertEqual(await first.get(), b'two')
+        self.assertTrue(second.queue.empty())
+
+    async def test_publish_from_a_worker_thread(self):
+        broker = InProcessBroker()
+        subscription = broker.subscribe()
+        await asyncio.to_thread(broker.publish, b'from a thread')
+        self.assertEqual(await asyncio.wait_for(subscription.get(), 1), b'from a thread')
+
+    async def test_slow_subscriber_drops_its_oldest_events(self):
+        broker = InProcessBroker(max_queued=2)
+        subscription = broker.subscribe()
+        for payload in (b'1', b'2', b'3'):
+            broker.publish(payload)
+        await asyncio.sleep(0)
+        self.assertEqual([subscription.queue.get_nowait() for _ in range(2)], [b'2', b'3'])
+
+    def test_subscriber_on_a_closed_loop_is_dropped(self):
+        broker = InProcessBroker()
+
+        async def subscribe():
+            return broker.subscribe()
+
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(subscribe())
+        loop.close()
+        broker.publish(b'lost')
+        self.assertFalse(broker._subscriptions)
+
+    async def test_submission_event_payload(self):
+        broker = InProcessBroker()
+        subscription = broker.subscribe()
+        submission = Submission(id=1, user_id=2, quiz_id=3, attempted_count=3, correct_count=2, is_completed=True)
+        with mock.patch('apps.quiz.events.get_broker', return_value=broker):
+            publish_submission_event(submission, created=False, was_completed=False)
+        await asyncio.sleep(0)
+
+        event, data = subscription.queue.get_nowait().decode().split('\n')[:2]
+        self.assertEqual(event, 'event: submission.completed')
+        payload = json.loads(data.removeprefix('data: '))
+        self.assertEqual(payload['submission'], {'id': 1, 'user_id': 2, 'quiz_id': 3, 'attempted_count': 3,
+                                                 'correct_count': 2, 'is_completed': True})
+        self.assertEqual(payload['summary_delta'], {'total_submissions': 0, 'completed_submissions': 1,
+                                                    'in_progress_submissions': -1})
+
+
+class SubmissionStreamTests(QuizTestCase):
+    url = '/api/quiz/admin/submissions-stream/'
+
+    def setUp(self):
+        self.broker = InProcessBroker()
+        patcher = mock.patch('apps.quiz.events.get_broker', return_value=self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def open_stream(self, user=None):
+        token = await asyncio.to_thread(issue_stream_token, user or self.admin)
+        response = await self.async_client.get(self.url, {'token': token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return response
+
+    async def test_stream_sends_summary_then_events(self):
+        stream = (await self.open_stream()).streaming_content
+        chunks = []
+
+        async def consume():
+            async for chunk in stream:
+                chunks.append(chunk)
+
+        consumer = asyncio.create_task(consume())
+        while not self.broker._subscriptions:
+            await asyncio.sleep(0.01)
+        self.broker.publish(encode_event('submission.progress', {'id': 1}))
+        while len(chunks) < 2:
+            await asyncio.sleep(0.01)
+
+        # A disconnect cancels the response task, which must release the subscription
+        consumer.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await consumer
+        self.assertTrue(chunks[0].startswith(b'event: summary\n'))
+        self.assertIn(b'"total_submissions":0', chunks[0])
+        self.assertEqual(chunks[1], encode_event('submission.progress', {'id': 1}))
+        self.assertFalse(self.broker._subscriptions)
+
+    async def test_stream_ends_after_its_lifetime(self):
+        with self.settings(SUBMISSION_STREAM={**settings.SUBMISSION_STREAM,
+                                              'HEARTBEAT_SECONDS': 0.01, 'MAX_SECONDS': 0.05}):
+            response = await self.open_stream()
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertTrue(chunks[0].startswith(b'event: summary\n'))
+        self.assertIn(b': keepalive\n\n', chunks)
+        self.assertFalse(self.broker._subscriptions)
+
+    async def test_stream_token_is_checked(self):
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get(self.url, {'token': 'forged'})
+        self.assertEqual(response.status_code, 401)
+        student = await User.objects.acreate(username='student')
+        response = await self.async_client.get(self.url, {'token': issue_stream_token(student)})
+        self.assertEqual(response.status_code, 403)
+
+    def test_token_endpoint_is_admin_only(self):
+        student = User.objects.create(username='student')
+        for user, status in ((self.admin, 200), (student, 403)):
+            response = self.client.post(f'{self.url}token/',
+                                        HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+            self.assertEqual(response.status_code, status)
+        self.assertEqual(self.client.post(f'{self.url}token/').status_code, 401)
+
+    def test_stream_is_refused_under_wsgi(self):
+        response = self.client.get(self.url, {'token': issue_stream_token(self.admin)})
+        self.assertEqual(response.status_code, 501)
+        self.assertFalse(self.broker._subscriptions)
+
+
+class QueryInspectionTests(QuizTestCase):
+    def test_budget(self):
+        with self.assertWarnsRegex(UserWarning, 'ran 2 queries, budget is 1'):
+            with detect_queries(budget=1, mode='warn'):
+                list(Quiz.objects.all())
+                list(Question.objects.all())
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            with detect_queries(budget=2, mode='warn'):
+                list(Quiz.objects.all())
+                list(Question.objects.all())
+        self.assertEqual(caught, [])
+        with self.assertRaises(QueryBudgetExceeded):
+            with detect_queries(budget=0):
+                list(Quiz.objects.all())
+
+    def test_repeated_queries(self):
+        questions = list(self.quiz.questions.all())
+        with self.assertRaises(NPlusOneDetected):
+            with detect_queries(threshold=3):
+                for question in questions:
+                    list(question.options.all())
+        with detect_queries(threshold=3):
+            list(Option.objects.filter(question__in=questions))
+
+    def test_submit_answer_stays_within_its_budget(self):
+        caches[settings.IDEMPOTENCY_CACHE].clear()
+        student = User.objects.create(username='student')
+        first, second, third = self.quiz.questions.order_by('id')
+        other = self.make_quiz('other').questions.first()
+        inspection = {**settings.QUERY_INSPECTION, 'ENABLED': True, 'MODE': 'raise'}
+        correct = dict(Option.objects.filter(is_correct=True).values_list('question_id', 'id'))
+
+        def submit(question, key):
+            return self.client.post(
+                '/api/quiz/submit-answer/', {'question_id': question.id, 'option_id': correct[question.id]},
+                content_type='application/json', HTTP_IDEMPOTENCY_KEY=key,
+                HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(student).access_token}',
+            )
+
+        with self.settings(QUERY_INSPECTION=inspection):
+            # First answer ever, a later one, a re-answer, completing the quiz, starting another quiz
+            for key, question in enumerate([first, second, first, third, other]):
+                self.assertEqual(submit(question, str(key)).status_code, 200)
+            # Every answered question is serialized without a query of its own
+            with detect_queries(budget=11):
+                response = submit(first, 'again')
+            self.assertEqual(len(response.json()['data']['answers']), 3)
+
+            with mock.patch('apps.quiz.views.SubmitAnswerView.query_budget', 5):
+                with self.assertRaises(QueryBudgetExceeded):
+                    submit(second, 'over')
+
+
+class CompressionTests(SimpleTestCase):
+    def test_zero_quality_is_not_accepted(self):
+        self.assertEqual(negotiate_encoding('gzip;q=0, identity'), None)
+        self.assertEqual(negotiate_encoding('gzip; q=0.5'), 'gzip')
+        self.assertNotEqual(negotiate_encoding('br;q=0, gzip'), 'br')
+
+    def test_compressed_response_gets_weak_etag(self):
+        def view(request):
+            response = HttpResponse(b'{"schema": 1}' * 500, content_type='application/json')
+            response['ETag'] = '"abc"'
+            return response
+
+        middleware = CompressionMiddleware(view)
+        compressed = middleware(RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip;q=1'))
+        identity = middleware(RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip;q=0'))
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(compressed['ETag'], 'W/"abc"')
+        self.assertFalse(identity.has_header('Content-Encoding'))
+        self.assertEqual(identity['ETag'], '"abc"')
+
+
+class SchemaViewTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        schema_file = Path(directory.name) / 'openapi-schema.json'
+        schema_file.write_text(json.dumps({'openapi': '3.0.3', 'paths': {f'/path/{i}/': {} for i in range(200)}}))
+        settings_override = self.settings(OPENAPI_SCHEMA_FILE=schema_file)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        _load_schema.cache_clear()
+        self.addCleanup(_load_schema.cache_clear)
+        self.view = CompressionMiddleware(cached_schema_view)
+
+    def get(self, **headers):
+        return self.view(RequestFactory().get('/api/schema/', **headers))
+
+    def test_matching_etag_is_not_modified(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['openapi'], '3.0.3')
+
+        not_modified = self.get(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_compressed_etag_is_not_modified(self):
+        compressed = self.get(HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertTrue(compressed['ETag'].startswith('W/'))
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=compressed['ETag']).status_code, 304)
+
+    def test_only_safe_methods(self):
+        self.assertEqual(cached_schema_view(RequestFactory().head('/api/schema/')).status_code, 200)
+        self.assertEqual(cached_schema_view(RequestFactory().post('/api/schema/')).status_code, 405)
+
+
+class ProfilingTests(QuizTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.profiles = Path(directory.name) / 'profiles'
+        settings_override = self.settings(PROFILING={**settings.PROFILING, 'DIR': self.profiles})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.student = User.objects.create(username='student')
+
+    def get(self, path, user, **headers):
+        return self.client.get(path, HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}',
+                               **headers)
+
+    def profiled_get(self, token):
+        return self.get('/api/quiz/categories/', self.admin, HTTP_X_PROFILE_TOKEN=token)
+
+    def test_requests_are_not_profiled_without_a_valid_admin_token(self):
+        self.assertNotIn('X-Profile-Id', self.get('/api/quiz/categories/', self.admin))
+        self.assertNotIn('X-Profile-Id', self.profiled_get('forged'))
+        self.assertNotIn('X-Profile-Id', self.profiled_get(profiling.issue_token(self.student)))
+
+        token = profiling.issue_token(self.admin)
+        with self.settings(PROFILING={**settings.PROFILING, 'TOKEN_MAX_AGE': -1}):
+            self.assertNotIn('X-Profile-Id', self.profiled_get(token))
+        User.objects.filter(pk=self.admin.pk).update(role='USER')
+        self.assertNotIn('X-Profile-Id', self.profiled_get(token))
+        self.assertFalse(self.profiles.exists())
+
+    def test_admin_token_profiles_one_request(self):
+        issued = self.client.post('/api/quiz/admin/profiles/token/',
+                                  HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.admin).access_token}')
+        self.assertEqual(issued.status_code, 200)
+        self.assertEqual(issued.json()['data']['header'], 'X-Profile-Token')
+
+        profile_id = self.profiled_get(issued.json()['data']['token'])['X-Profile-Id']
+        listed = self.get('/api/quiz/admin/profiles/', self.admin).json()['data']
+        self.assertEqual([profile['id'] for profile in listed], [profile_id])
+        self.assertGreater(listed[0]['query_count'], 0)
+
+        sql = self.get(f'/api/quiz/admin/profiles/{profile_id}/?part=sql', self.admin)
+        self.assertEqual(json.loads(b''.join(sql.streaming_content))['path'], '/api/quiz/categories/')
+        dump = self.get(f'/api/quiz/admin/profiles/{profile_id}/', self.admin)
+        self.assertIn('attachment', dump['Content-Disposition'])
+
+    def test_profile_endpoints_are_admin_only(self):
+        token = f'Bearer {RefreshToken.for_user(self.student).access_token}'
+        self.assertEqual(self.client.post('/api/quiz/admin/profiles/token/', HTTP_AUTHORIZATION=token).status_code, 403)
+        self.assertEqual(self.get('/api/quiz/admin/profiles/', self.student).status_code, 403)
+        self.assertEqual(self.get('/api/quiz/admin/profiles/20260101000000000000-abcdef12/', self.student).status_code, 403)
+
+
+class AdminChangelistTests(QuizTestCase):
+    """Every changelist stays within its query budget with enough rows to expose an N+1"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.superuser = User.objects.create(username='support', is_staff=True, is_superuser=True)
+        for i in range(6):
+            quiz = cls.make_quiz(f'quiz {i}', category=Category.objects.create(name=f'category {i}'))
+            user = User.objects.create(username=f'student {i}')
+            for question in quiz.questions.all():
+                cls.answer(user, question, correct=i % 2 == 0)
+            PurgeJob.objects.create(target='quiz', target_id=quiz.id, created_by=cls.superuser)
+            hour = timezone.now().replace(minute=0, second=0, microsecond=0) - timezone.timedelta(hours=i)
+            ActivityRollup.objects.create(period='hour', bucket_start=hour, category_id=quiz.category_id,
+                                          quiz_id=quiz.id, attempts=3)
+        ArchivedSubmissionAnswer.objects.bulk_create([
+            ArchivedSubmissionAnswer(submission_id=answer.submission_id, question_id=answer.question_id,
+                                     selected_option_id=answer.selected_option_id, is_correct=answer.is_correct,
+                                     created_at=answer.created_at)
+            for answer in SubmissionAnswer.objects.all()
+        ])
+        RollupWatermark.objects.create(period='hour', processed_until=timezone.now())
+
+    def get_changelist(self, model_admin, params=None):
+        request = RequestFactory().get('/admin/', params or {})
+        request.user = self.superuser
+        with detect_queries(label=f"{type(model_admin).__name__} changelist",
+                            budget=model_admin.changelist_query_budget, mode='raise'):
+            response = model_admin.changelist_view(request)
+            response.render()
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_changelists_stay_within_budget(self):
+        model_admins = [model_admin for model_admin in admin.site._registry.values()
+                        if isinstance(model_admin, ScalableAdminMixin)]
+        self.assertGreaterEqual(len(model_admins), 10)
+        for model_admin in model_admins:
+            with self.subTest(model_admin=type(model_admin).__name__):
+                self.get_changelist(model_admin)
+
+    def test_filtered_and_searched_quiz_changelist_stays_within_budget(self):
+        quiz_admin = admin.site._registry[Quiz]
+        response = self.get_changelist(quiz_admin, {'is_active__exact': '1', 'is_deleted__exact': '0', 'q': 'quiz'})
+        self.assertEqual(response.context_data['cl'].result_count, 7)
+
+
+class QuizAdminActionTests(QuizTestCase):
+    def setUp(self):
+        self.large = self.make_quiz('large', questions=6)
+        self.quiz_admin = admin.site._registry[Quiz]
+        self.request = RequestFactory().post('/admin/')
+        self.request.user = self.admin
+        for question in [*self.quiz.questions.all(), *self.large.questions.all()]:
+            self.answer(User.objects.create(username=f'student {question.id}'), question)
+        Option.objects.update(is_correct=Case(When(is_correct=True, then=False), default=True))
+
+    def run_action(self, action):
+        with mock.patch.object(self.quiz_admin, 'message_user') as message_user, \
+                self.settings(ADMIN_ACTION_ROW_LIMIT=4):
+            getattr(self.quiz_admin, action)(self.request, Quiz.objects.filter(id__in=[self.quiz.id, self.large.id]))
+        return [call.args[1] for call in message_user.call_args_list]
+
+    def test_regrade_leaves_large_quizzes_to_the_command(self):
+        messages = self.run_action('regrade_quizzes')
+        self.assertEqual(messages[0], "3 answers regraded, 3 submissions updated")
+        self.assertIn(f"Quizzes {self.large.id} are too large", messages[1])
+        self.assertIn("manage.py regrade --quiz <id>", messages[1])
+        self.assertFalse(SubmissionAnswer.objects.filter(submission__quiz=self.quiz, is_correct=True).exists())
+        self.assertEqual(SubmissionAnswer.objects.filter(submission__quiz=self.large, is_correct=True).count(), 6)
+
+    def test_clone_leaves_large_quizzes_to_the_command(self):
+        messages = self.run_action('clone_quizzes')
+        self.assertEqual(messages[0], "0 quizzes cloned")
+        self.assertIn(f"Quizzes {self.quiz.id}, {self.large.id} are too large", messages[1])
+
+        with self.settings(ADMIN_ACTION_ROW_LIMIT=12):
+            self.quiz_admin.message_user = mock.Mock()
+            self.quiz_admin.clone_quizzes(self.request, Quiz.objects.filter(id__in=[self.quiz.id, self.large.id]))
+            del self.quiz_admin.message_user
+        self.assertEqual(list(Quiz.objects.filter(parent=self.quiz).values_list('version', flat=True)), [2])
+        self.assertFalse(Quiz.objects.filter(parent=self.large).exists())
+
+        call_command('clone_quiz', quiz=self.large.id, stdout=StringIO())
+        self.assertEqual(Quiz.objects.get(parent=self.large).questions.count(), 6)
+
+
+class QuizCloneTests(QuizTestCase):
+    def setUp(self):
+        caches[settings.IDEMPOTENCY_CACHE].clear()
+        self.auth = f'Bearer {RefreshToken.for_user(self.admin).access_token}'
+
+    def test_clone_copies_questions_and_remaps_correct_options(self):
+        clone = QuizService.clone_quiz(self.quiz.id, self.admin, title='quiz copy')
+
+        self.assertEqual((clone.title, clone.parent_id, clone.version, clone.is_active),
+                         ('quiz copy', self.quiz.id, 2, False))
+        self.assertEqual(clone.questions.count(), 3)
+        self.assertEqual(Option.objects.filter(question__quiz=clone).count(), 6)
+        for question in clone.questions.all():
+            self.assertEqual(list(question.options.values_list('text', 'is_correct').order_by('id')),
+                             [('right', True), ('wrong', False)])
+        # The source quiz is left untouched
+        self.assertEqual(Option.objects.filter(question__quiz=self.quiz).count(), 6)
+
+    def test_versions_are_numbered_across_the_family(self):
+        second = QuizService.clone_quiz(self.quiz.id, self.admin)
+        third = QuizService.clone_quiz(second.id, self.admin)
+        fourth = QuizService.clone_quiz(self.quiz.id, self.admin)
+
+        self.assertEqual([second.version, third.version, fourth.version], [2, 3, 4])
+        self.assertEqual({second.parent_id, third.parent_id, fourth.parent_id}, {self.quiz.id})
+
+    def test_version_numbers_are_unique_per_family(self):
+        QuizService.clone_quiz(self.quiz.id, self.admin)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Quiz.objects.create(title='duplicate', category=self.category, created_by=self.admin,
+                                parent=self.quiz, version=2)
+
+    def test_clone_view(self):
+        response = self.client.post(f'/api/quiz/quizzes/{self.quiz.id}/clone/', {'title': 'via api'},
+                                    content_type='application/json', HTTP_AUTHORIZATION=self.auth,
+                                    HTTP_IDEMPOTENCY_KEY='clone-1')
+        self.assertEqual(response.status_code, 201)
+        data = response.json()['data']
+        self.assertEqual((data['title'], data['parent_id'], data['version'], data['is_active']),
+                         ('via api', self.quiz.id, 2, False))
+
+        # A retry with the same key replays the response instead of cloning again
+        replay = self.client.post(f'/api/quiz/quizzes/{self.quiz.id}/clone/', {'title': 'via api'},
+                                  content_type='application/json', HTTP_AUTHORIZATION=self.auth,
+                                  HTTP_IDEMPOTENCY_KEY='clone-1')
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(Quiz.objects.filter(parent=self.quiz).count(), 1)
+
+        missing = self.client.post('/api/quiz/quizzes/0/clone/', {}, content_type='application/json',
+                                   HTTP_AUTHORIZATION=self.auth)
+        self.assertEqual(missing.status_code, 404)
+
+
+class AnswerLogReplayTests(QuizTestCase):
+    def setUp(self):
+        self.first, self.second, _ = self.quiz.questions.order_by('id')
+        self.early = User.objects.create(username='early')
+        self.late = User.objects.create(username='late')
+
+    def test_replay_keeps_a_later_regrade(self):
+        submission = self.answer(self.early, self.first)
+        self.first.options.update(is_correct=Case(When(is_correct=True, then=False), default=True))
+        RegradeService.regrade(quiz_id=self.quiz.id)
+
+        state, _ = AnswerLogService.replay()
+        AnswerLogService.apply(state)
+
+        submission.refresh_from_db()
+        self.assertEqual(submission.correct_count, 0)
+        self.assertFalse(submission.answers.get().is_correct)
+        # The log itself still records the grading at submission time
+        self.assertTrue(AnswerEvent.objects.get(submission_id=submission.id).is_correct)
+
+    def test_point_in_time_replay_resets_submissions_that_started_later(self):
+        early = self.answer(self.early, self.first)
+        cutoff = AnswerEvent.objects.latest('id').id
+        self.answer(self.early, self.second)
+        late = self.answer(self.late, self.first)
+
+        state, _ = AnswerLogService.replay(until_sequence=cutoff)
+        self.assertEqual(state[late.id], {})
+        AnswerLogService.apply(state)
+
+        early.refresh_from_db()
+        late.refresh_from_db()
+        self.assertEqual((early.attempted_count, early.correct_count), (1, 1))
+        self.assertEqual((late.attempted_count, late.correct_count, late.is_completed), (0, 0, False))
+        self.assertFalse(late.answers.exists())
+
+
+class RollupTests(QuizTestCase):
+    def setUp(self):
+        self.student = User.objects.create(username='student')
+        first, second, _ = self.quiz.questions.order_by('id')
+        self.answer(self.student, first)
+        self.answer(self.student, second, correct=False)
+        self.hour = timezone.make_aware(timezone.datetime(2026, 3, 1, 9, 0))
+        self.first_event, self.second_event = AnswerEvent.objects.order_by('id')
+        self.move(self.first_event, minutes=10)
+        self.move(self.second_event, minutes=70)
+
+    def move(self, event, minutes):
+        AnswerEvent.objects.filter(id=event.id).update(created_at=self.hour + timezone.timedelta(minutes=minutes))
+
+    def run_at(self, minutes):
+        return RollupService.run_incremental(now=self.hour + timezone.timedelta(minutes=minutes))
+
+    def watermark(self, period):
+        return RollupWatermark.objects.get(period=period).processed_until
+
+    def attempts(self, bucket_start, period='hour'):
+        return dict(ActivityRollup.objects.filter(period=period, bucket_start=bucket_start).values_list(
+            'quiz_id', 'attempts'
+        ))
+
+    def test_incremental_runs_build_each_closed_bucket_once(self):
+        next_hour = self.hour + timezone.timedelta(hours=1)
+        self.assertEqual(self.run_at(66), {'hour': 1, 'day': 0})
+        self.assertEqual(self.watermark('hour'), next_hour)
+        self.assertFalse(RollupWatermark.objects.filter(period='day').exists())
+        self.assertEqual(self.attempts(self.hour), {self.quiz.id: 1, None: 1})
+
+        # Nothing new has closed, so a rerun builds nothing
+        self.assertEqual(self.run_at(90), {'hour': 0, 'day': 0})
+
+        # Catching up after a pause builds every bucket in between, the empty ones included
+        self.assertEqual(self.run_at(4 * 60 + 6), {'hour': 3, 'day': 0})
+        self.assertEqual(self.watermark('hour'), self.hour + timezone.timedelta(hours=4))
+        self.assertEqual(self.attempts(next_hour), {self.quiz.id: 1, None: 1})
+        self.assertEqual(ActivityRollup.objects.filter(period='hour').count(), 4)
+
+    def test_bucket_stays_open_until_the_lag_has_passed(self):
+        self.move(self.second_event, minutes=59)
+        lag = settings.ROLLUP_LAG_SECONDS // 60
+
+        self.assertEqual(self.run_at(60 + lag - 1), {'hour': 0, 'day': 0})
+        self.assertFalse(RollupWatermark.objects.exists())
+
+        # An answer stamped just before the hour ended but written late still counts in that hour
+        self.assertEqual(self.run_at(60 + lag + 1), {'hour': 1, 'day': 0})
+        self.assertEqual(self.attempts(self.hour), {self.quiz.id: 2, None: 2})
+
+    def test_day_bucket_and_report(self):
+        day = RollupService.floor(self.hour, 'day')
+        built = RollupService.run_incremental(now=day + timezone.timedelta(days=1, minutes=10))
+        self.assertEqual(built['day'], 1)
+        self.assertEqual(self.watermark('day'), day + timezone.timedelta(days=1))
+
+        report = RollupService.get_report('day', day, day + timezone.timedelta(days=1), quiz_id=self.quiz.id)
+        self.assertEqual(report['processed_until'], day + timezone.timedelta(days=1))
+        [row] = report['rows']
+        self.assertEqual((row['attempts'], row['correct_answers'], row['active_users']), (2, 1, 1))
+
+
+class ArchiveTests(QuizTestCase):
+    def setUp(self):
+        self.student = User.objects.create(username='student')
+        self.auth = f'Bearer {RefreshToken.for_user(self.student).access_token}'
+        self.first, self.second, self.third = self.quiz.questions.order_by('id')
+        self.answer(self.student, self.first)
+        self.answer(self.student, self.second)
+        self.submission = self.answer(self.student, self.third, correct=False)
+        SubmissionAnswer.objects.filter(question=self.first).update(
+            created_at=timezone.now() - timezone.timedelta(days=ArchiveService.DAYS_PER_MONTH * 2 + 1)
+        )
+
+    def get_submission(self):
+        response = self.client.get(f'/api/quiz/quizzes/{self.quiz.id}/my-submission/',
+                                   HTTP_AUTHORIZATION=self.auth)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def test_age_cutoff_moves_only_old_answers(self):
+        self.assertEqual(ArchiveService.archive_answers(older_than_months=3), 0)
+        self.assertEqual(ArchiveService.archive_answers(older_than_months=2), 1)
+
+        self.submission.refresh_from_db()
+        self.assertTrue(self.submission.has_archived_answers)
+        self.assertEqual((self.submission.attempted_count, self.submission.correct_count), (3, 2))
+        self.assertEqual(list(self.submission.archived_answers.values_list('question_id', flat=True)),
+                         [self.first.id])
+        self.assertEqual(self.submission.answers.count(), 2)
+
+    def test_inactive_quizzes_are_archived_whole(self):
+        QuestionService.toggle_quiz_status(self.quiz.id)
+        self.assertEqual(ArchiveService.archive_answers(inactive_quizzes=True, chunk_size=2), 3)
+        self.assertFalse(SubmissionAnswer.objects.exists())
+        with self.assertRaises(ValueError):
+            ArchiveService.archive_answers()
+
+    def test_archived_answers_are_still_returned(self):
+        before = self.get_submission()
+        ArchiveService.archive_answers(older_than_months=2)
+        # The user, the submission with its quiz, live answers, archived answers
+        with self.assertNumQueries(4):
+            after = self.get_submission()
+        self.assertEqual(sorted(after['answers'], key=lambda answer: answer['question_text']),
+                         sorted(before['answers'], key=lambda answer: answer['question_text']))
+        self.assertEqual((after['attempted_count'], after['correct_count']), (3, 2))
+
+    def test_reanswering_an_archived_question_replaces_it(self):
+        ArchiveService.archive_answers(older_than_months=2)
+        submission = self.answer(self.student, self.first, correct=False)
+
+        self.assertEqual((submission.attempted_count, submission.correct_count), (3, 1))
+        self.assertFalse(submission.archived_answers.exists())
+        self.assertFalse(submission.answers.get(question=self.first).is_correct)
+        self.assertEqual(len(self.get_submission()['answers']), 3)
+
+
+class ScoreStatisticsTests(QuizTestCase):
+    @skipUnless(services.np is not None, "numpy is not installed")
+    def test_numpy_and_python_summaries_agree(self):
+        generator = random.Random(7)
+        samples = [
+            [(0, 1, 1)],
+            [(3, 3, 2), (0, 3, 1)],
+            [(correct, attempted, generator.randint(1, 50))
+             for attempted in range(1, 21) for correct in range(attempted + 1)],
+            [(generator.randint(0, 7), 7, generator.randint(1, 9)) for _ in range(40)],
+        ]
+        for rows in samples:
+            for bins in settings.SCORE_STATS_BINS:
+                with self.subTest(rows=len(rows), bins=bins):
+                    expected = StatisticsService._summarize_numpy(rows, bins)
+                    actual = StatisticsService._summarize_python(rows, bins)
+                    self.assertEqual(actual['count'], expected['count'])
+                    self.assertEqual(actual['histogram'], expected['histogram'])
+                    for field in ('mean', 'median', 'std', 'min', 'max'):
+                        self.assertAlmostEqual(actual[field], expected[field], places=9)
+                    for p in StatisticsService.PERCENTILES:
+                        self.assertAlmostEqual(actual['percentiles'][p], expected['percentiles'][p], places=9)
+        self.assertIsNone(StatisticsService._summarize_python([(0, 0, 4)], 10))
+        self.assertIsNone(StatisticsService._summarize_numpy([(0, 0, 4)], 10))
+
+    def test_submit_invalidates_quiz_and_category_statistics(self):
+        cache.clear()
+        first, second, _ = self.quiz.questions.order_by('id')
+        self.answer(User.objects.create(username='first'), first)
+        self.assertEqual(StatisticsService.get_score_statistics(quiz_id=self.quiz.id)['mean'], 100)
+        self.assertEqual(StatisticsService.get_score_statistics(category_id=self.category.id)['count'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.answer(User.objects.create(username='second'), second, correct=False)
+        quiz_stats = StatisticsService.get_score_statistics(quiz_id=self.quiz.id)
+        self.assertEqual((quiz_stats['count'], quiz_stats['mean']), (2, 50))
+        self.assertEqual(StatisticsService.get_score_statistics(category_id=self.category.id)['count'], 2)
+
+
+class PurgeTests(QuizTestCase):
+    def setUp(self):
+        cache.clear()
+        self.auth = f'Bearer {RefreshToken.for_user(self.admin).access_token}'
+        self.other = self.make_quiz('other')
+        self.clone = Quiz.objects.create(title='quiz v2', category=self.category, created_by=self.admin,
+                                         parent=self.quiz, version=2)
+        self.student = User.objects.create(username='student')
+        for quiz in (self.quiz, self.other):
+            for question in quiz.questions.all():
+                self.answer(self.student, question)
+
+    def purge(self, path):
+        response = self.client.post(f'/api/quiz/{path}/purge/', HTTP_AUTHORIZATION=self.auth)
+        self.assertEqual(response.status_code, 202)
+        return PurgeJob.objects.get(id=response.json()['data']['id'])
+
+    def resume(self, **options):
+        call_command('purge', resume=True, batch_size=2, stdout=StringIO(), stderr=StringIO(), **options)
+
+    def test_quiz_purge(self):
+        SubmissionAnswer.objects.filter(submission__quiz=self.quiz).update(
+            created_at=timezone.now() - timezone.timedelta(days=365))
+        ArchiveService.archive_answers(older_than_months=6)
+        self.assertEqual(StatisticsService.get_score_statistics(category_id=self.category.id)['count'], 2)
+        self.assertEqual(StatisticsService.get_score_statistics(quiz_id=self.quiz.id)['count'], 1)
+
+        job = self.purge(f'quizzes/{self.quiz.id}')
+        self.assertTrue(Quiz.objects.get(id=self.quiz.id).is_deleted)
+        self.resume()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.deleted_counts, {'archived_answers': 3, 'submissions': 1, 'options': 6,
+                                              'questions': 3, 'quizzes': 1})
+        self.assertFalse(Quiz.objects.filter(id=self.quiz.id).exists())
+        self.assertIsNone(Quiz.objects.get(id=self.clone.id).parent_id)
+        self.assertEqual(Submission.objects.get().quiz_id, self.other.id)
+        self.assertEqual(StatisticsService.get_score_statistics(quiz_id=self.quiz.id)['count'], 0)
+        self.assertEqual(StatisticsService.get_score_statistics(category_id=self.category.id)['count'], 1)
+
+    def test_category_purge(self):
+        kept = self.make_quiz('kept', category=Category.objects.create(name='kept'))
+        self.answer(self.student, kept.questions.first())
+        self.assertEqual(StatisticsService.get_score_statistics(category_id=self.category.id)['count'], 2)
+
+        job = self.purge(f'categories/{self.category.id}')
+        self.resume()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.deleted_counts['quizzes'], 3)
+        self.assertEqual(job.deleted_counts['categories'], 1)
+        self.assertFalse(Category.objects.filter(id=self.category.id).exists())
+        self.assertEqual(list(Quiz.objects.values_list('id', flat=True)), [kept.id])
+        self.assertFalse(UserCategoryStats.objects.filter(category_id=self.category.id).exists())
+        self.assertEqual(StatisticsService.get_score_statistics(category_id=self.category.id)['count'], 0)
+
+    def test_resume_after_a_failure_midway(self):
+        job = self.purge(f'categories/{self.category.id}')
+        delete_in_batches = PurgeService._delete_in_batches
+
+        def fail_on_options(job, step, *args, **kwargs):
+            if step == 'options' and job.deleted_counts.get('answers'):
+                raise RuntimeError("connection lost")
+            return delete_in_batches(job, step, *args, **kwargs)
+
+        with mock.patch.object(PurgeService, '_delete_in_batches', side_effect=fail_on_options):
+            self.resume()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('failed', 'connection lost'))
+        self.assertEqual(job.deleted_counts, {'answers': 3, 'submissions': 1})
+
+        self.resume()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('done', ''))
+        self.assertEqual(job.deleted_counts['answers'], 6)
+        self.assertEqual(job.deleted_counts['submissions'], 2)
+        self.assertEqual(job.deleted_counts['quizzes'], 3)
+        self.assertFalse(Quiz.objects.exists())
+
+    def test_a_job_is_run_by_one_worker_at_a_time(self):
+        job = PurgeService.request_purge('quiz', self.quiz.id)
+        self.assertTrue(PurgeService.claim_job(job))
+        self.assertFalse(PurgeService.claim_job(PurgeJob.objects.get(id=job.id)))
+        self.assertNotIn(job, PurgeService.get_unfinished_jobs())
+        self.assertIsNone(PurgeService.run_job(PurgeJob.objects.get(id=job.id)))
+        self.assertTrue(Quiz.objects.filter(id=self.quiz.id).exists())
+
+        # A worker that stopped saving progress loses the job
+        stale = timezone.now() - timezone.timedelta(seconds=settings.PURGE_JOB_STALE_SECONDS + 1)
+        PurgeJob.objects.filter(id=job.id).update(updated_at=stale)
+        self.assertIn(job, PurgeService.get_unfinished_jobs())
+        self.assertEqual(PurgeService.run_job(PurgeJob.objects.get(id=job.id)).status, 'done')
+        self.assertFalse(Quiz.objects.filter(id=self.quiz.id).exists())
+
+
+class SubmissionHistoryTests(QuizTestCase):
+    def setUp(self):
+        self.auth = f'Bearer {RefreshToken.for_user(self.admin).access_token}'
+        student = User.objects.create(username='student')
+        first, second, _ = self.quiz.questions.order_by('id')
+        self.submission = self.answer(student, first)
+        self.answer(student, second)
+        self.started = timezone.make_aware(timezone.datetime(2026, 3, 1, 9, 0))
+        for hours, event in enumerate(AnswerEvent.objects.order_by('id')):
+            AnswerEvent.objects.filter(id=event.id).update(created_at=self.started + timezone.timedelta(hours=hours * 2))
+
+    def history(self, until):
+        return self.client.get(f'/api/quiz/admin/submissions/{self.submission.id}/history/', {'until': until},
+                               HTTP_AUTHORIZATION=self.auth)
+
+    def test_naive_until_is_read_in_the_configured_time_zone(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', RuntimeWarning)
+            response = self.history('2026-03-01T10:00:00')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual(data['attempted_count'], 1)
+        self.assertEqual(timezone.datetime.fromisoformat(data['until']), self.started + timezone.timedelta(hours=1))
+
+        # An explicit offset is kept: 10:00 UTC is after both events
+        self.assertEqual(self.history('2026-03-01T10:00:00+00:00').json()['data']['attempted_count'], 2)
+
+    def test_invalid_until(self):
+        for until in ('yesterday', '2026-13-01T00:00:00'):
+            with self.subTest(until=until):
+                self.assertEqual(self.history(until).status_code, 400)
+
+
+class UserStatsSyncTests(QuizTestCase):
+    """Paths that change scores outside submit_answer keep the per-user stats in step"""
+
+    def setUp(self):
+        self.student = User.objects.create(username='student')
+        self.submission = self.answer(self.student, self.quiz.questions.order_by('id').first())
+
+    def assertStats(self, attempted, correct):
+        overall = UserCategoryStats.objects.get(user=self.student, category__isnull=True)
+        per_category = UserCategoryStats.objects.get(user=self.student, category=self.category)
+        for row in (overall, per_category):
+            self.assertEqual((row.questions_attempted, row.correct_answers), (attempted, correct))
+
+    def flip_answer_key(self):
+        Option.objects.filter(question__quiz=self.quiz).update(
+            is_correct=Case(When(is_correct=True, then=False), default=True)
+        )
+
+    def test_regrade_updates_stats(self):
+        self.assertStats(1, 1)
+        self.flip_answer_key()
+        RegradeService.regrade(quiz_id=self.quiz.id)
+        self.assertStats(1, 0)
+
+    def test_counter_repair_updates_stats(self):
+        SubmissionAnswer.objects.filter(submission=self.submission).update(is_correct=False)
+        SubmissionAuditService.repair(SubmissionAuditService.find_mismatches())
+        self.assertStats(1, 0)
+
+    def test_purge_updates_stats(self):
+        self.answer(self.student, self.make_quiz('other').questions.first(), correct=False)
+        self.assertStats(2, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            PurgeService.request_purge('quiz', self.quiz.id)
+
+        response = self.client.get('/api/quiz/my-stats/',
+                                   HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.student).access_token}')
+        data = response.json()['data']
+        for row in (data['overall'], *data['categories']):
+            self.assertEqual((row['quizzes_started'], row['questions_attempted'], row['correct_answers']), (1, 1, 0))
+
+    def test_replay_updates_stats(self):
+        self.flip_answer_key()
+        state, _ = AnswerLogService.replay()
+        AnswerLogService.apply(state)
+        self.assertStats(1, 0)
+
+
+class QuestionSamplingTests(QuizTestCase):
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create(username='student')
+        self.bank = self.make_quiz('bank', questions=30)
+
+    def sample_ids(self, user, count=10):
+        return [question.id for question in QuestionService.sample_questions(user, count, quiz_id=self.bank.id)]
+
+    def test_same_seed_gives_the_same_set(self):
+        ids = QuestionService.get_question_ids('quiz', self.bank.id)
+        seed = QuestionService.sample_seed(self.student.id, 'quiz', self.bank.id)
+        self.assertEqual(QuestionService.draw(ids, 10, seed), QuestionService.draw(ids, 10, seed))
+        self.assertEqual(self.sample_ids(self.student), self.sample_ids(self.student))
+
+    def test_different_seeds_give_different_sets(self):
+        other = User.objects.create(username='other')
+        self.assertNotEqual(set(self.sample_ids(self.student)), set(self.sample_ids(other)))
+        self.assertNotEqual(
+            QuestionService.sample_seed(self.student.id, 'quiz', self.bank.id),
+            QuestionService.sample_seed(self.student.id, 'quiz', self.quiz.id),
+        )
+
+    def test_draws_are_spread_evenly(self):
+        bank = list(range(20))
+        counts = [0] * len(bank)
+        for user_id in range(4000):
+            for drawn in QuestionService.draw(bank, 5, QuestionService.sample_seed(user_id, 'quiz', 1)):
+                counts[drawn] += 1
+        # 1000 hits expected per id, with a standard deviation of about 27
+        self.assertTrue(all(850 < count < 1150 for count in counts), counts)
+
+    def test_added_question_is_drawn(self):
+        self.assertEqual(len(self.sample_ids(self.student, count=100)), 30)
+        added = QuestionService.create_question_with_options(
+            self.bank.id, 'added', [{'text': 'right', 'is_correct': True}, {'text': 'wrong'}]
+        )
+        drawn = self.sample_ids(self.student, count=100)
+        self.assertEqual(len(drawn), 31)
+        self.assertIn(added.id, drawn)
+
+    def test_removed_questions_are_not_drawn(self):
+        drawn = self.sample_ids(self.student)
+        request = RequestFactory().post('/admin/')
+        request.user = self.admin
+        admin.site._registry[Question].delete_queryset(request, Question.objects.filter(id=drawn[0]))
+        # Deleted behind the cache's back: the draw falls back to a fresh id list
+        Question.objects.filter(id=drawn[1]).delete()
+
+        redrawn = self.sample_ids(self.student)
+        self.assertEqual(len(redrawn), 10)
+        self.assertNotIn(drawn[0], redrawn)
+        self.assertNotIn(drawn[1], redrawn)
+        self.assertEqual(list(QuestionService.get_question_ids('quiz', self.bank.id)),
+                         list(self.bank.questions.order_by('id').values_list('id', flat=True)))
+
+    def test_deactivated_quiz_leaves_the_category_bank(self):
+        category_ids = set(QuestionService.get_question_ids('category', self.category.id))
+        QuestionService.toggle_quiz_status(self.bank.id)
+        self.assertEqual(set(QuestionService.get_question_ids('category', self.category.id)),
+                         category_ids - set(self.bank.questions.values_list('id', flat=True)))
@@ -3,7 +3,11 @@ from .views import (
     CategoryListCreateView, QuizListCreateView, 
     QuestionCreateView, QuizDetailView, QuizToggleStatusView,
     SubmitAnswerView, UserSubmissionView, QuizSubmissionsView,
-    UserAllSubmissionsView, AdminSubmissionOverviewView
+    UserAllSubmissionsView, AdminSubmissionOverviewView, QuizRegradeView, AdminSubmissionStreamView,
+    AdminSubmissionStreamTokenView,
+    AdminIdempotencyStatsView, AdminProfileTokenView, AdminProfileListView, AdminProfileDownloadView,
+    ScoreStatisticsView, PurgeView, PurgeJobDetailView, AdminSubmissionHistoryView,
+    UserStatsView, ActivityReportView, QuestionSampleView, QuizCloneView
 )
 
 urlpatterns = [
@@ -11,10 +15,28 @@ urlpatterns = [
     path('quizzes/', QuizListCreateView.as_view(), name='quiz-list-create'),
     path('questions/', QuestionCreateView.as_view(), name='question-create'),
     path('quizzes/<int:quiz_id>/', QuizDetailView.as_view(), name='quiz-detail'),
+    path('quizzes/<int:quiz_id>/sample/', QuestionSampleView.as_view(), name='quiz-question-sample'),
+    path('categories/<int:category_id>/sample/', QuestionSampleView.as_view(), name='category-question-sample'),
+    path('quizzes/<int:quiz_id>/clone/', QuizCloneView.as_view(), name='quiz-clone'),
     path('quizzes/<int:quiz_id>/toggle-status/', QuizToggleStatusView.as_view(), name='quiz-toggle-status'),
+    path('quizzes/<int:quiz_id>/statistics/', ScoreStatisticsView.as_view(), name='quiz-statistics'),
+    path('categories/<int:category_id>/statistics/', ScoreStatisticsView.as_view(), name='category-statistics'),
+    path('quizzes/<int:quiz_id>/purge/', PurgeView.as_view(), name='quiz-purge'),
+    path('categories/<int:category_id>/purge/', PurgeView.as_view(), name='category-purge'),
+    path('admin/purge-jobs/<int:job_id>/', PurgeJobDetailView.as_view(), name='purge-job-detail'),
     path('submit-answer/', SubmitAnswerView.as_view(), name='submit-answer'),
     path('quizzes/<int:quiz_id>/my-submission/', UserSubmissionView.as_view(), name='user-submission'),
     path('my-submissions/', UserAllSubmissionsView.as_view(), name='user-all-submissions'),
+    path('my-stats/', UserStatsView.as_view(), name='user-stats'),
     path('quizzes/<int:quiz_id>/submissions/', QuizSubmissionsView.as_view(), name='quiz-submissions'),
+    path('quizzes/<int:quiz_id>/regrade/', QuizRegradeView.as_view(), name='quiz-regrade'),
     path('admin/submissions-overview/', AdminSubmissionOverviewView.as_view(), name='admin-submissions-overview'),
+    path('admin/submissions/<int:submission_id>/history/', AdminSubmissionHistoryView.as_view(), name='admin-submission-history'),
+    path('admin/submissions-stream/', AdminSubmissionStreamView.as_view(), name='admin-submissions-stream'),
+    path('admin/submissions-stream/token/', AdminSubmissionStreamTokenView.as_view(), name='admin-submissions-stream-token'),
+    path('admin/reports/activity/', ActivityReportView.as_view(), name='admin-activity-report'),
+    path('admin/idempotency-stats/', AdminIdempotencyStatsView.as_view(), name='admin-idempotency-stats'),
+    path('admin/profiles/', AdminProfileListView.as_view(), name='admin-profile-list'),
+    path('admin/profiles/token/', AdminProfileTokenView.as_view(), name='admin-profile-token'),
+    path('admin/profiles/<str:profile_id>/', AdminProfileDownloadView.as_view(), name='admin-profile-download'),
 ]
\ No newline at end of file
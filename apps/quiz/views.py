@@ -1,17 +1,38 @@
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, StreamingHttpResponse
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
-from .models import Category, Quiz, Question
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from .models import Category, Quiz, Question, PurgeJob, Submission
 from .serializers import (
     CategorySerializer, QuizSerializer, CreateQuizSerializer, 
     CreateQuestionSerializer, QuestionSerializer, ToggleQuizStatusSerializer,
-    SubmitAnswerSerializer, SubmissionSerializer, SimpleUserScoreSerializer, AdminSubmissionOverviewSerializer
+    SubmitAnswerSerializer, SubmissionSerializer, SimpleUserScoreSerializer, AdminSubmissionOverviewSerializer,
+    RegradeSerializer, PurgeJobSerializer, AnswerEventSerializer, UserCategoryStatsSerializer,
+    ActivityReportSerializer, QuestionSampleSerializer, CloneQuizSerializer
+)
+from .services import (
+    CategoryService, QuizService, QuestionService, SubmissionService, RegradeService, StatisticsService,
+    PurgeService, AnswerLogService, UserStatsService, RollupService
 )
-from .services import CategoryService, QuizService, QuestionService, SubmissionService
 from .permissions import IsAdminUser
 from utlis.response import ResponseHandler
+from utlis.db_router import ReplicaReadMixin
+from utlis.idempotency import IdempotentMixin, get_stats as get_idempotency_stats
+from utlis.admission import AdmissionControlMixin
+from utlis import profiling
+from .events import StreamTokenAuthentication, issue_stream_token, submission_event_stream
 
+# query_budget on a view is the number of queries one request may run, including
+# the JWT user lookup; utlis.query_inspection flags views that exceed it in development.
 class CategoryListCreateView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
+    query_budget = 3
     
     def get(self, request):
         categories = CategoryService.get_all_categories()
@@ -39,6 +60,7 @@ class CategoryListCreateView(generics.GenericAPIView):
 
 class QuizListCreateView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
+    query_budget = 4
     
     def get(self, request):
         quizzes = QuizService.get_all_quizzes()
@@ -67,7 +89,7 @@ class QuizListCreateView(generics.GenericAPIView):
                 return ResponseHandler.error(error="Failed to create quiz")
         return ResponseHandler.error(error=ResponseHandler.get_error_message(serializer.errors))
 
-class QuestionCreateView(generics.GenericAPIView):
+class QuestionCreateView(IdempotentMixin, generics.GenericAPIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
     
     def post(self, request):
@@ -94,6 +116,7 @@ class QuestionCreateView(generics.GenericAPIView):
 
 class QuizDetailView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
+    query_budget = 4
     
     def get(self, request, quiz_id):
         quiz = QuizService.get_quiz_by_id(quiz_id)
@@ -103,13 +126,64 @@ class QuizDetailView(generics.GenericAPIView):
         serializer = QuizSerializer(quiz)
         return ResponseHandler.success(data=serializer.data, message="Quiz retrieved successfully")
 
+class QuestionSampleView(generics.GenericAPIView):
+    serializer_class = QuestionSampleSerializer
+    permission_classes = [IsAuthenticated]
+    query_budget = 4
+    
+    def get(self, request, quiz_id=None, category_id=None):
+        serializer = self.get_serializer(data=request.query_params)
+        if not serializer.is_valid():
+            return ResponseHandler.error(error=ResponseHandler.get_error_message(serializer.errors))
+        try:
+            questions = QuestionService.sample_questions(
+                request.user, serializer.validated_data['count'], quiz_id=quiz_id, category_id=category_id
+            )
+        except ValueError as e:
+            return ResponseHandler.error(error=str(e), status=404)
+        return ResponseHandler.success(
+            data=QuestionSerializer(questions, many=True).data,
+            message="Questions drawn successfully"
+        )
+
+class QuizCloneView(IdempotentMixin, generics.GenericAPIView):
+    serializer_class = CloneQuizSerializer
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    
+    def post(self, request, quiz_id):
+        serializer = self.get_serializer(data=request.data)
+        if serializer.is_valid():
+            try:
+                clone = QuizService.clone_quiz(
+                    quiz_id,
+                    request.user,
+                    title=serializer.validated_data.get('title'),
+                    category_id=serializer.validated_data.get('category_id')
+                )
+                return ResponseHandler.success(
+                    data={
+                        "id": clone.id,
+                        "title": clone.title,
+                        "parent_id": clone.parent_id,
+                        "version": clone.version,
+                        "is_active": clone.is_active
+                    },
+                    message="Quiz cloned successfully",
+                    status=201
+                )
+            except ValueError as e:
+                return ResponseHandler.error(error=str(e), status=404)
+            except Exception as e:
+                return ResponseHandler.error(error="Failed to clone quiz")
+        return ResponseHandler.error(error=ResponseHandler.get_error_message(serializer.errors))
+
 class QuizToggleStatusView(generics.GenericAPIView):
     serializer_class = ToggleQuizStatusSerializer
     permission_classes = [IsAuthenticated, IsAdminUser]
     
     def patch(self, request, quiz_id):
         try:
-            quiz = QuizService.toggle_quiz_status(quiz_id)
+            quiz = QuestionService.toggle_quiz_status(quiz_id)
             status_text = "activated" if quiz.is_active else "deactivated"
             return ResponseHandler.success(
                 data={"id": quiz.id, "is_active": quiz.is_active},
@@ -120,9 +194,12 @@ class QuizToggleStatusView(generics.GenericAPIView):
         except Exception as e:
             return ResponseHandler.error(error="Failed to toggle quiz status")
 
-class SubmitAnswerView(generics.GenericAPIView):
+class SubmitAnswerView(IdempotentMixin, AdmissionControlMixin, generics.GenericAPIView):
     serializer_class = SubmitAnswerSerializer
+    admission_class = 'grading'
     permission_classes = [IsAuthenticated]
+    # Answering a question runs 13; a user's first answer also creates the submission and their stats rows
+    query_budget = 23
     
     def post(self, request):
         if not request.data:
@@ -136,6 +213,7 @@ class SubmitAnswerView(generics.GenericAPIView):
                     question_id=serializer.validated_data['question_id'],
                     option_id=serializer.validated_data['option_id']
                 )
+                SubmissionService.prefetch_answers([submission])
                 return ResponseHandler.success(
                     data=SubmissionSerializer(submission).data,
                     message="Answer submitted successfully"
@@ -148,6 +226,7 @@ class SubmitAnswerView(generics.GenericAPIView):
 
 class UserSubmissionView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
+    query_budget = 7
     
     def get(self, request, quiz_id):
         submission = SubmissionService.get_user_submission(request.user, quiz_id)
@@ -157,8 +236,10 @@ class UserSubmissionView(generics.GenericAPIView):
         serializer = SubmissionSerializer(submission)
         return ResponseHandler.success(data=serializer.data, message="Submission retrieved successfully")
 
-class QuizSubmissionsView(generics.GenericAPIView):
+class QuizSubmissionsView(ReplicaReadMixin, AdmissionControlMixin, generics.GenericAPIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
+    admission_class = 'admin'
+    query_budget = 5
     
     def get(self, request, quiz_id):
         submissions = SubmissionService.get_quiz_submissions(quiz_id)
@@ -167,6 +248,7 @@ class QuizSubmissionsView(generics.GenericAPIView):
 
 class UserAllSubmissionsView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
+    query_budget = 4
     
     def get(self, request):
         quiz_overview = SubmissionService.get_user_quiz_overview(request.user)
@@ -192,24 +274,15 @@ class UserAllSubmissionsView(generics.GenericAPIView):
             message="User quiz overview retrieved successfully"
         )
 
-class AdminSubmissionOverviewView(generics.GenericAPIView):
+class AdminSubmissionOverviewView(ReplicaReadMixin, AdmissionControlMixin, generics.GenericAPIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
+    admission_class = 'admin'
+    query_budget = 3
     
     def get(self, request):
         submissions = SubmissionService.get_all_submissions()
         serializer = AdminSubmissionOverviewSerializer(submissions, many=True)
-        
-        # Calculate summary statistics
-        total_submissions = submissions.count()
-        completed_submissions = submissions.filter(is_completed=True).count()
-        in_progress_submissions = submissions.filter(is_completed=False, attempted_count__gt=0).count()
-        
-        summary = {
-            "total_submissions": total_submissions,
-            "completed_submissions": completed_submissions,
-            "in_progress_submissions": in_progress_submissions,
-            "completion_rate": round((completed_submissions / total_submissions * 100), 2) if total_submissions > 0 else 0
-        }
+        summary = SubmissionService.get_submission_summary()
         
         return ResponseHandler.success(
             data={
@@ -217,4 +290,228 @@ class AdminSubmissionOverviewView(generics.GenericAPIView):
                 "submissions": serializer.data
             },
             message="Admin submission overview retrieved successfully"
-        )
\ No newline at end of file
+        )
+
+class QuizRegradeView(generics.GenericAPIView):
+    serializer_class = RegradeSerializer
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    
+    def post(self, request, quiz_id):
+        serializer = self.get_serializer(data=request.data)
+        if serializer.is_valid():
+            question_id = serializer.validated_data.get('question_id')
+            if question_id and not QuestionService.get_questions_by_quiz(quiz_id).filter(id=question_id).exists():
+                return ResponseHandler.error(error="Question not found in this quiz", status=404)
+            try:
+                result = RegradeService.regrade(
+                    quiz_id=quiz_id,
+                    question_id=question_id,
+                    chunk_size=serializer.validated_data.get('chunk_size'),
+                    start_after=serializer.validated_data['start_after']
+                )
+                return ResponseHandler.success(data=result, message="Regrade completed successfully")
+            except ValueError as e:
+                return ResponseHandler.error(error=str(e), status=404)
+            except Exception as e:
+                return ResponseHandler.error(error="Failed to regrade submissions")
+        return ResponseHandler.error(error=ResponseHandler.get_error_message(serializer.errors))
+
+
+class AdminSubmissionStreamView(generics.GenericAPIView):
+    authentication_classes = [JWTAuthentication, StreamTokenAuthentication]
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    
+    def get(self, request):
+        if not isinstance(request._request, ASGIRequest):
+            # A WSGI worker would buffer the endless stream and stay tied up until it is killed
+            return ResponseHandler.error(error="The submissions stream is only served under ASGI", status=501)
+        
+        # Initial snapshot, after which the dashboard applies each event's summary_delta
+        summary = SubmissionService.get_submission_summary()
+        stream = submission_event_stream(
+            summary,
+            heartbeat_seconds=settings.SUBMISSION_STREAM['HEARTBEAT_SECONDS'],
+            max_seconds=settings.SUBMISSION_STREAM['MAX_SECONDS'],
+        )
+        response = StreamingHttpResponse(stream, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class AdminSubmissionStreamTokenView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    
+    def post(self, request):
+        return ResponseHandler.success(
+            data={
+                "token": issue_stream_token(request.user),
+                "expires_in": settings.SUBMISSION_STREAM['TOKEN_MAX_AGE']
+            },
+            message="Stream token issued successfully"
+        )
+
+
+class AdminIdempotencyStatsView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    
+    def get(self, request):
+        return ResponseHandler.success(data=get_idempotency_stats(), message="Idempotency stats retrieved successfully")
+
+
+class AdminProfileTokenView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    
+    def post(self, request):
+        return ResponseHandler.success(
+            data={
+                "header": settings.PROFILING['HEADER'],
+                "token": profiling.issue_token(request.user),
+                "expires_in": settings.PROFILING['TOKEN_MAX_AGE']
+            },
+            message="Profiling token issued successfully"
+        )
+
+class AdminProfileListView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    
+    def get(self, request):
+        return ResponseHandler.success(data=profiling.list_profiles(), message="Profiles retrieved successfully")
+
+class AdminProfileDownloadView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    
+    def get(self, request, profile_id):
+        # ?part=sql returns the metadata and SQL timeline, otherwise the raw cProfile dump
+        suffix = '.json' if request.query_params.get('part') == 'sql' else '.prof'
+        path = profiling.profile_path(profile_id, suffix)
+        if not path:
+            return ResponseHandler.error(error="Profile not found", status=404)
+        return FileResponse(path.open('rb'), as_attachment=suffix == '.prof', filename=path.name)
+
+
+class ScoreStatisticsView(ReplicaReadMixin, AdmissionControlMixin, generics.GenericAPIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    admission_class = 'admin'
+    query_budget = 2
+    
+    def get(self, request, quiz_id=None, category_id=None):
+        try:
+            bins = int(request.query_params.get('bins', 10))
+            statistics = StatisticsService.get_score_statistics(quiz_id=quiz_id, category_id=category_id, bins=bins)
+        except ValueError as e:
+            return ResponseHandler.error(error=str(e))
+        return ResponseHandler.success(data=statistics, message="Score statistics retrieved successfully")
+
+
+class PurgeView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    
+    def post(self, request, quiz_id=None, category_id=None):
+        target, target_id = ('quiz', quiz_id) if quiz_id is not None else ('category', category_id)
+        try:
+            job = PurgeService.request_purge(target, target_id, user=request.user)
+        except ValueError as e:
+            return ResponseHandler.error(error=str(e), status=404)
+        # Deletion itself runs in `manage.py purge --resume`, the object is already hidden
+        return ResponseHandler.success(
+            data=PurgeJobSerializer(job).data,
+            message=f"{target.capitalize()} hidden and queued for deletion",
+            status=202
+        )
+
+class PurgeJobDetailView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    
+    def get(self, request, job_id):
+        try:
+            job = PurgeJob.objects.get(id=job_id)
+        except PurgeJob.DoesNotExist:
+            return ResponseHandler.error(error="Purge job not found", status=404)
+        return ResponseHandler.success(data=PurgeJobSerializer(job).data, message="Purge job retrieved successfully")
+
+
+class AdminSubmissionHistoryView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    query_budget = 3
+    
+    def get(self, request, submission_id):
+        until = request.query_params.get('until')
+        if until:
+            try:
+                until = parse_datetime(until)
+            except ValueError:
+                until = None
+            if until is None:
+                return ResponseHandler.error(error="until must be an ISO 8601 datetime")
+            # Same as replay_answers --until: a time without an offset is in TIME_ZONE
+            if timezone.is_naive(until):
+                until = timezone.make_aware(until)
+        
+        events = AnswerLogService.get_history(submission_id)
+        if until:
+            events = events.filter(created_at__lte=until)
+        events = list(events)
+        if not events and not Submission.objects.filter(id=submission_id).exists():
+            return ResponseHandler.error(error="Submission not found", status=404)
+        
+        # Replay in memory: the last event per question is the answer as of the cut-off
+        answers = {}
+        for event in events:
+            answers[event.question_id] = event
+        return ResponseHandler.success(
+            data={
+                "submission_id": submission_id,
+                "until": until,
+                "attempted_count": len(answers),
+                "correct_count": sum(1 for event in answers.values() if event.is_correct),
+                "answers": AnswerEventSerializer(answers.values(), many=True).data,
+                "events": AnswerEventSerializer(events, many=True).data,
+            },
+            message="Submission history retrieved successfully"
+        )
+
+
+class UserStatsView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+    query_budget = 2
+    
+    def get(self, request):
+        overall, categories = UserStatsService.get_user_stats(request.user)
+        return ResponseHandler.success(
+            data={
+                "overall": UserCategoryStatsSerializer(overall).data if overall else None,
+                "categories": UserCategoryStatsSerializer(categories, many=True).data,
+            },
+            message="User statistics retrieved successfully"
+        )
+
+
+class ActivityReportView(ReplicaReadMixin, AdmissionControlMixin, generics.GenericAPIView):
+    serializer_class = ActivityReportSerializer
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    admission_class = 'admin'
+    query_budget = 3
+    
+    def get(self, request):
+        serializer = self.get_serializer(data=request.query_params)
+        if not serializer.is_valid():
+            return ResponseHandler.error(error=ResponseHandler.get_error_message(serializer.errors))
+        
+        params = serializer.validated_data
+        start = timezone.make_aware(datetime.combine(params['start'], time.min))
+        end = timezone.make_aware(datetime.combine(params['end'] + timedelta(days=1), time.min))
+        report = RollupService.get_report(
+            params['period'], start, end,
+            category_id=params.get('category_id'),
+            quiz_id=params.get('quiz_id')
+        )
+        return ResponseHandler.success(
+            data={
+                "period": params['period'],
+                "start": params['start'],
+                "end": params['end'],
+                **report
+            },
+            message="Activity report retrieved successfully"
+        )
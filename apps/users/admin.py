@@ -1,3 +1,13 @@
 from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
-# Register your models here.
+from utlis.admin import ScalableAdminMixin
+from .models import User
+
+
+@admin.register(User)
+class UserAdmin(ScalableAdminMixin, BaseUserAdmin):
+    list_display = ['id', 'username', 'role', 'is_staff', 'is_active', 'date_joined']
+    list_filter = ['role', 'is_staff', 'is_active']
+    search_fields = ['username__exact']
+    fieldsets = BaseUserAdmin.fieldsets + (("Quiz", {"fields": ("role",)}),)
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, make_password
+
+from .services import get_hash_pool
+
+User = get_user_model()
+
+
+def _check_password(password, encoded):
+    """Runs on the hash pool: returns (is_correct, new_encoded or None)"""
+    if encoded is None:
+        # Hash anyway so unknown usernames take as long as wrong passwords
+        make_password(password)
+        return False, None
+    rehashed = []
+    is_correct = check_password(password, encoded, setter=lambda raw: rehashed.append(make_password(raw)))
+    return is_correct, rehashed[0] if rehashed else None
+
+
+class HashPoolModelBackend(ModelBackend):
+    """ModelBackend that verifies (and rehashes) the password on the login hash pool.
+
+    Called through django.contrib.auth.authenticate(), so the other
+    AUTHENTICATION_BACKENDS and the user_login_failed signal still apply.
+    The user is read and written on the request thread, which keeps every
+    query on the request's own connection and transaction. The request
+    thread waits for the hash: the pool bounds how many hashes run at once
+    and sheds the rest, it does not free the thread meanwhile.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if settings.LOGIN_HASH_WORKERS == 0:
+            return super().authenticate(request, username=username, password=password, **kwargs)
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        user = User._default_manager.filter(**{User.USERNAME_FIELD: username}).first()
+        is_correct, rehashed = get_hash_pool().run(_check_password, password, user.password if user else None)
+        if not is_correct or not self.user_can_authenticate(user):
+            return None
+        if rehashed:
+            # Only replace the hash that was verified, never a password changed meanwhile
+            User._default_manager.filter(pk=user.pk, password=user.password).update(password=rehashed)
+            user.password = rehashed
+        return user
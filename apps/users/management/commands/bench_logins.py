@@ -0,0 +1,144 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from statistics import median
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+
+from apps.users.hashers import TunablePBKDF2PasswordHasher
+from apps.users.services import UserService
+from utlis.admission import AdmissionRejected
+
+User = get_user_model()
+
+USERNAME_PREFIX = 'bench-login-'
+PASSWORD = 'bench-login-password'
+
+
+def refresh_tokens(refresh):
+    """What POST /api/token/refresh/ does: validate the refresh token and sign a new access token"""
+    serializer = TokenRefreshSerializer(data={'refresh': refresh})
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data
+
+
+def available_cores():
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class Command(BaseCommand):
+    help = "Measure logins/sec per core through the login hot path, and token refreshes/sec for comparison"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--logins', type=int, default=500)
+        parser.add_argument('--refreshes', type=int, default=5000)
+        parser.add_argument('--clients', type=int, default=None,
+                            help="Concurrent request threads (default: 2 per hash worker)")
+        parser.add_argument('--iterations', type=int, default=None,
+                            help="PBKDF2 cost to benchmark (default: PASSWORD_HASH_ITERATIONS)")
+        parser.add_argument('--stale', type=int, default=20,
+                            help="Users seeded at half the cost, which login must rehash")
+
+    def _seed(self, options, iterations):
+        current = make_password(PASSWORD)
+        with override_settings(PASSWORD_HASH_ITERATIONS=max(1, iterations // 2)):
+            stale = make_password(PASSWORD)
+        User.objects.bulk_create([
+            User(username=f'{USERNAME_PREFIX}{i}', password=stale if i < options['stale'] else current)
+            for i in range(options['users'])
+        ], batch_size=1000)
+
+    def _run(self, clients, jobs, fn):
+        """Spread jobs over client threads; returns (elapsed seconds, latencies ms, results, rejected)"""
+        def client(chunk):
+            latencies, results, rejected = [], [], 0
+            try:
+                for job in chunk:
+                    started = time.perf_counter()
+                    try:
+                        results.append(fn(job))
+                    except AdmissionRejected:
+                        rejected += 1
+                    latencies.append((time.perf_counter() - started) * 1000)
+            finally:
+                connection.close()
+            return latencies, results, rejected
+
+        chunks = [jobs[i::clients] for i in range(clients)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            outcomes = list(executor.map(client, chunks))
+        elapsed = time.perf_counter() - started
+        latencies = sorted(latency for outcome in outcomes for latency in outcome[0])
+        results = [result for outcome in outcomes for result in outcome[1]]
+        return elapsed, latencies, results, sum(outcome[2] for outcome in outcomes)
+
+    def _report(self, label, count, elapsed, latencies, cores):
+        rate = count / elapsed
+        p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0
+        self.stdout.write(
+            f"{label}: {count} in {elapsed:.2f}s = {rate:.0f}/s, {rate / cores:.1f}/s per core; "
+            f"latency median {median(latencies) if latencies else 0:.1f} ms, p99 {p99:.1f} ms"
+        )
+        return rate
+
+    def handle(self, *args, **options):
+        iterations = options['iterations'] or TunablePBKDF2PasswordHasher().iterations
+        workers = settings.LOGIN_HASH_WORKERS
+        clients = options['clients'] or 2 * (workers or 1)
+        cores = min(workers or clients, available_cores())
+        if options['stale'] > options['users']:
+            raise CommandError("--stale cannot be larger than --users")
+        if User.objects.filter(username__startswith=USERNAME_PREFIX).exists():
+            raise CommandError(f"Users named {USERNAME_PREFIX}* already exist; remove them first")
+
+        self.stdout.write(
+            f"PBKDF2 {iterations} iterations, {workers or 'no'} hash workers "
+            f"({'request thread' if not workers else 'pool'}), {clients} clients, {cores} cores used"
+        )
+        with override_settings(PASSWORD_HASH_ITERATIONS=iterations):
+            self._seed(options, iterations)
+            try:
+                encoded = make_password(PASSWORD)
+                started = time.perf_counter()
+                for _ in range(20):
+                    check_password(PASSWORD, encoded)
+                single = 20 / (time.perf_counter() - started)
+                self.stdout.write(f"one hash on one core: {1000 / single:.1f} ms, ceiling {single:.1f} logins/s per core")
+
+                usernames = [f'{USERNAME_PREFIX}{i % options["users"]}' for i in range(options['logins'])]
+                elapsed, latencies, tokens, rejected = self._run(
+                    clients, usernames, lambda username: UserService.authenticate_user(username, PASSWORD)
+                )
+                rate = self._report("logins", len(tokens), elapsed, latencies, cores)
+                if rejected:
+                    self.stdout.write(self.style.WARNING(f"{rejected} logins shed by the hash pool"))
+                if not tokens:
+                    raise CommandError("No login succeeded")
+
+                refreshes = [tokens[i % len(tokens)]['refresh'] for i in range(options['refreshes'])]
+                elapsed, latencies, results, _ = self._run(clients, refreshes, refresh_tokens)
+                refresh_rate = self._report("refreshes", len(results), elapsed, latencies, cores)
+                self.stdout.write(f"a refresh costs {rate / refresh_rate:.4f} of a login")
+
+                stale = [
+                    identify_hasher(password).decode(password)['iterations']
+                    for password in User.objects.filter(
+                        username__in=[f'{USERNAME_PREFIX}{i}' for i in range(options['stale'])]
+                    ).values_list('password', flat=True)
+                ]
+                if any(cost != iterations for cost in stale):
+                    raise CommandError("Some stale hashes were not upgraded on login")
+                self.stdout.write(f"{len(stale)} stale hashes upgraded to {iterations} iterations")
+            finally:
+                User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+        self.stdout.write(self.style.SUCCESS("Login benchmark finished"))
@@ -1,34 +1,90 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from django.conf import settings
 from django.contrib.auth import authenticate, get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from utlis.admission import AdmissionRejected
+
 User = get_user_model()
 
+
+class PasswordHashPool:
+    """Bounded thread pool for password hashing.
+
+    hashlib's PBKDF2 releases the GIL, so the workers use every core. The
+    calling thread still blocks until its hash is done: what the pool bounds
+    is concurrency. At most ``workers + queue`` hashes are admitted at once;
+    beyond that logins are shed instead of piling up.
+    """
+
+    def __init__(self, workers=None, queue=None, timeout=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+        self.slots = threading.BoundedSemaphore(self.workers + (self.workers * 4 if queue is None else queue))
+
+    def run(self, fn, *args):
+        if not self.slots.acquire(blocking=False):
+            raise AdmissionRejected("Too many logins in progress, please retry shortly", 503, 1)
+        try:
+            future = self.executor.submit(fn, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # The hash still finishes in the background and frees its slot then
+            raise AdmissionRejected("Login timed out, please retry shortly", 503, 1)
+
+
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+
+
+def get_hash_pool():
+    global _hash_pool
+    if _hash_pool is None:
+        with _hash_pool_lock:
+            if _hash_pool is None:
+                _hash_pool = PasswordHashPool(
+                    workers=settings.LOGIN_HASH_WORKERS,
+                    queue=settings.LOGIN_HASH_QUEUE,
+                    timeout=settings.LOGIN_HASH_TIMEOUT_SECONDS,
+                )
+    return _hash_pool
+
+
 class UserService:
     @staticmethod
     def create_user(username, password):
         """Create a new user"""
         if User.objects.filter(username=username).exists():
             raise ValueError("A user with that username already exists.")
-        
+
         user = User(username=username)
         user.set_password(password)
         user.save()
         return user
-    
+
     @staticmethod
     def authenticate_user(username, password):
         """Authenticate user and return tokens"""
         user = authenticate(username=username, password=password)
         if not user:
             raise ValueError("Invalid username or password")
-        
+
         refresh = RefreshToken.for_user(user)
         return {
             "access": str(refresh.access_token),
             "refresh": str(refresh),
             "username": user.username
         }
-    
+
     @staticmethod
     def promote_to_admin(user):
         """Promote user to admin role"""
@@ -1,3 +1,81 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, identify_hasher, make_password
+from django.contrib.auth.signals import user_login_failed
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from . import backends, services
+from .hashers import TunablePBKDF2PasswordHasher
+from .models import User
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class LoginTests(TestCase):
+    def setUp(self):
+        with override_settings(PASSWORD_HASH_ITERATIONS=500):
+            self.user = User.objects.create(username='student', password=make_password('secret-pass'))
+
+    def login(self, username='student', password='secret-pass'):
+        return self.client.post('/api/auth/login/', {'username': username, 'password': password},
+                                content_type='application/json')
+
+    def iterations(self):
+        self.user.refresh_from_db()
+        return identify_hasher(self.user.password).decode(self.user.password)['iterations']
+
+    def test_login_rehashes_to_the_configured_cost(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['username'], 'student')
+        self.assertEqual(self.iterations(), 1000)
+        self.assertEqual(self.login().status_code, 200)
+
+    @override_settings(LOGIN_HASH_WORKERS=0)
+    def test_login_on_the_request_thread_rehashes_too(self):
+        self.assertEqual(self.login().status_code, 200)
+        self.assertEqual(self.iterations(), 1000)
+
+    def test_rejected_credentials(self):
+        self.assertEqual(self.login(password='wrong').status_code, 400)
+        self.assertEqual(self.login(username='nobody').status_code, 400)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.login().status_code, 400)
+        self.assertEqual(self.iterations(), 500)
+
+    def test_failed_login_sends_the_signal(self):
+        failures = []
+        handler = lambda sender, credentials, **kwargs: failures.append(credentials['username'])
+        user_login_failed.connect(handler)
+        self.addCleanup(user_login_failed.disconnect, handler)
+
+        self.assertEqual(self.login(password='wrong').status_code, 400)
+        self.assertEqual(self.login(username='nobody').status_code, 400)
+        self.assertEqual(failures, ['student', 'nobody'])
+
+    @override_settings(AUTHENTICATION_BACKENDS=['django.contrib.auth.backends.ModelBackend'])
+    def test_login_goes_through_the_configured_backends(self):
+        with mock.patch.object(backends, 'get_hash_pool') as get_hash_pool:
+            self.assertEqual(self.login().status_code, 200)
+        get_hash_pool.assert_not_called()
+
+    def test_full_hash_pool_sheds_logins(self):
+        pool = services.PasswordHashPool(workers=1, queue=0)
+        pool.slots.acquire()
+        with mock.patch.object(services, '_hash_pool', pool):
+            response = self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+
+    def test_refresh_needs_no_password(self):
+        refresh = self.login().json()['data']['refresh']
+        with mock.patch.object(backends, '_check_password') as check_password:
+            response = self.client.post('/api/token/refresh/', {'refresh': refresh}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.json())
+        check_password.assert_not_called()
+
+
+class HashIterationsTests(SimpleTestCase):
+    @override_settings(PASSWORD_HASH_ITERATIONS=None)
+    def test_unset_cost_follows_django(self):
+        self.assertEqual(TunablePBKDF2PasswordHasher().iterations, PBKDF2PasswordHasher.iterations)
@@ -6,13 +6,16 @@ from django.contrib.auth import get_user_model
 from .serializers import RegisterSerializer, LoginSerializer , PromoteToAdminSerializer
 from .services import UserService
 from utlis.response import ResponseHandler
+from utlis.idempotency import IdempotentMixin
+from utlis.admission import AdmissionControlMixin
 
 User = get_user_model()
 
 
-class RegisterView(generics.GenericAPIView):
+class RegisterView(IdempotentMixin, AdmissionControlMixin, generics.GenericAPIView):
     serializer_class = RegisterSerializer
     permission_classes = [AllowAny]
+    admission_class = 'auth'
 
     def post(self, request):
         if not request.data:
@@ -34,9 +37,10 @@ class RegisterView(generics.GenericAPIView):
         return ResponseHandler.error(error=ResponseHandler.get_error_message(serializer.errors))
 
 
-class LoginView(generics.GenericAPIView):
+class LoginView(AdmissionControlMixin, generics.GenericAPIView):
     serializer_class = LoginSerializer
     permission_classes = [AllowAny]
+    admission_class = 'auth'
 
     def post(self, request):
         if not request.data:
@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+from importlib.util import find_spec
 from dotenv import load_dotenv
 from datetime import timedelta
 
@@ -32,7 +33,11 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+    ),
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ] + (['utlis.renderers.MessagePackRenderer'] if find_spec('msgpack') else []),
 }
 
 SPECTACULAR_SETTINGS = {
@@ -41,13 +46,25 @@ SPECTACULAR_SETTINGS = {
     'VERSION': '1.0.0',
 }
 
+SERVE_API_DOCS = True
+SERVE_ADMIN = True
+
+# Generated at build time with
+#   python manage.py spectacular --format openapi-json --file openapi-schema.json
+# and served as-is when present; otherwise the schema is built per request.
+OPENAPI_SCHEMA_FILE = BASE_DIR / "openapi-schema.json"
+
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "utlis.compression.CompressionMiddleware",
+    "utlis.profiling.RequestProfilingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
+    "utlis.db_router.ReplicaPinningMiddleware",
+    "utlis.query_inspection.QueryInspectionMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -80,6 +97,131 @@ DATABASES = {
     }
 }
 
+# Read replicas for the admin/analytics views, e.g. DB_REPLICA_HOSTS=replica1.internal,replica2.internal
+for index, host in enumerate(filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['utlis.db_router.PrimaryReplicaRouter']
+
+# How long a user's reads stay on the primary after they wrote something.
+# Use a shared cache backend when running more than one worker process.
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '5'))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Stored responses for Idempotency-Key replays; MAX_ENTRIES bounds memory and
+    # the oldest entries are culled first. Point it at a shared backend to
+    # deduplicate retries that land on different workers.
+    'idempotency': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'idempotency',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+}
+
+# LocMemCache is per process, so cache invalidation (score statistics, question ids,
+# replica pins) never reaches the other workers. Set REDIS_URL (needs `pip install redis`)
+# to share the default cache when running more than one worker process.
+if os.getenv('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL'),
+    }
+
+IDEMPOTENCY_CACHE = 'idempotency'
+IDEMPOTENCY_TTL_SECONDS = 24 * 60 * 60
+IDEMPOTENCY_LOCK_SECONDS = 10
+
+# Development N+1 detector: flags a query shape repeated REPEAT_THRESHOLD times in one
+# request and views exceeding their query_budget. MODE is 'warn' or 'raise'.
+QUERY_INSPECTION = {
+    'ENABLED': DEBUG,
+    'MODE': 'warn',
+    'REPEAT_THRESHOLD': 5,
+}
+
+# On-demand profiling: a request carrying a token from POST /api/quiz/admin/profiles/token/
+# in HEADER runs under cProfile; the newest RING_SIZE profiles are kept in DIR.
+PROFILING = {
+    'HEADER': 'X-Profile-Token',
+    'DIR': BASE_DIR / "profiles",
+    'RING_SIZE': 50,
+    'TOKEN_MAX_AGE': 60 * 60,
+}
+
+# Filtered admin changelists count at most this many rows
+ADMIN_EXACT_COUNT_LIMIT = 10000
+
+# Admin actions run inside the request, so a regrade or clone touching more rows than
+# this is left to its management command instead
+ADMIN_ACTION_ROW_LIMIT = 20000
+
+# A purge job saves its progress after every batch. A job marked running without progress
+# for this long is assumed to belong to a dead worker and is taken over by `purge --resume`.
+PURGE_JOB_STALE_SECONDS = 10 * 60
+
+# Score statistics are cached per quiz/category and dropped whenever their submissions
+# change. The drop only reaches other processes through a shared cache (see REDIS_URL);
+# with LocMemCache they serve their copy until this TTL, which also bounds staleness
+# from writes that bypass the services.
+SCORE_STATS_CACHE_SECONDS = 15 * 60
+SCORE_STATS_BINS = [5, 10, 20, 50, 100]
+
+# Question ids per quiz/category for random draws; dropped when questions or quiz status
+# change through the services. Other processes only see the drop with a shared cache;
+# otherwise the TTL bounds their staleness as well as that of other writes.
+QUESTION_SAMPLE_CACHE_SECONDS = 10 * 60
+
+# Hourly/daily activity rollups. A bucket is built ROLLUP_LAG_SECONDS after it ends so
+# answers committed late still land in it; reports are capped per period to bound the rows read.
+ROLLUP_LAG_SECONDS = 5 * 60
+ROLLUP_REPORT_MAX_DAYS = {'hour': 31, 'day': 366}
+
+# Responses smaller than this are not worth the CPU to compress
+RESPONSE_COMPRESSION_MIN_BYTES = 1024
+RESPONSE_COMPRESSION_GZIP_LEVEL = 6
+RESPONSE_COMPRESSION_BROTLI_QUALITY = 5
+
+# Per endpoint class limits enforced by utlis.admission.AdmissionControlMixin.
+# Rates are requests per second per worker process; omitted limits are not enforced.
+ADMISSION_CONTROL = {
+    'grading': {
+        'global_rate': 500, 'global_burst': 1000,
+        'user_rate': 5, 'user_burst': 20,
+        'max_concurrency': 32,
+        'latency_threshold_ms': 2000,
+    },
+    'auth': {
+        'global_rate': 100, 'global_burst': 300,
+        'max_concurrency': 16,
+        'latency_threshold_ms': 3000,
+    },
+    'admin': {
+        'max_concurrency': 4,
+        'latency_threshold_ms': 5000,
+    },
+}
+
+# Broker behind the admin submissions stream. The in-process broker only reaches
+# dashboards connected to the same worker, so run the stream on a single ASGI worker.
+QUIZ_EVENT_BROKER = 'apps.quiz.events.InProcessBroker'
+
+# EventSource can't send an Authorization header, so dashboards connect with a ?token=
+# from POST /api/quiz/admin/submissions-stream/token/, valid for TOKEN_MAX_AGE seconds.
+# Django before 5.0 never notices a closed stream, so every stream ends after
+# MAX_SECONDS and the browser reconnects; that bounds what a gone client holds on to.
+SUBMISSION_STREAM = {
+    'HEARTBEAT_SECONDS': 15,
+    'MAX_SECONDS': 5 * 60,
+    'TOKEN_MAX_AGE': 60 * 60,
+}
+
 
 LANGUAGE_CODE = "en-us"
 TIME_ZONE = "Asia/Kolkata" 
@@ -100,4 +242,27 @@ AUTH_USER_MODEL = "users.User"
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),  # 1 hour
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),  # 7 days
-}
\ No newline at end of file
+    # Refreshing only returns a new access token; rotation needs the blacklist app to be worth it
+    'ROTATE_REFRESH_TOKENS': False,
+}
+
+# Same PBKDF2 hashes as Django's default, with the cost tunable per deployment.
+# Stored hashes are upgraded (or downgraded) to this count on the next successful login.
+PASSWORD_HASHERS = [
+    'apps.users.hashers.TunablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+# Unset, the cost follows the installed Django's PBKDF2 default as it is raised each release.
+PASSWORD_HASH_ITERATIONS = int(os.getenv('PASSWORD_HASH_ITERATIONS', '0')) or None
+
+# Verifies passwords on the login hash pool below, through authenticate() so signals still fire
+AUTHENTICATION_BACKENDS = ['apps.users.backends.HashPoolModelBackend']
+
+# Login password checks run on a bounded per-process thread pool (PBKDF2 releases the GIL).
+# Hashes beyond workers + queue are rejected with a 503; 0 workers checks on the request thread.
+LOGIN_HASH_WORKERS = int(os.getenv('LOGIN_HASH_WORKERS', str(os.cpu_count() or 1)))
+LOGIN_HASH_QUEUE = int(os.getenv('LOGIN_HASH_QUEUE', str(4 * LOGIN_HASH_WORKERS)))
+LOGIN_HASH_TIMEOUT_SECONDS = 5
\ No newline at end of file
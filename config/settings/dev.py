@@ -2,4 +2,20 @@ from .base import *
 
 DEBUG = True
 
-ALLOWED_HOSTS = ['localhost', '127.0.0.1', '*']
\ No newline at end of file
+ALLOWED_HOSTS = ['localhost', '127.0.0.1', '*']
+
+# Local SQLite databases instead of Postgres, e.g. DEV_SQLITE_DB=primary.sqlite3.
+# Add DEV_SQLITE_REPLICA=replica.sqlite3 to exercise the replica routing with a second file.
+if os.getenv('DEV_SQLITE_DB'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / os.getenv('DEV_SQLITE_DB'),
+        }
+    }
+    if os.getenv('DEV_SQLITE_REPLICA'):
+        DATABASES['replica_1'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / os.getenv('DEV_SQLITE_REPLICA'),
+            'TEST': {'MIRROR': 'default'},
+        }
@@ -0,0 +1,25 @@
+from .base import *
+
+DEBUG = False
+
+ALLOWED_HOSTS = [host for host in os.getenv('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
+
+# API workers don't serve the docs or the admin unless asked to, which keeps
+# drf_spectacular, the admin and their templates out of worker startup.
+SERVE_API_DOCS = os.getenv('SERVE_API_DOCS', 'False') == 'True'
+SERVE_ADMIN = os.getenv('SERVE_ADMIN', 'False') == 'True'
+
+INSTALLED_APPS = [
+    app for app in INSTALLED_APPS
+    if (SERVE_ADMIN or app != 'django.contrib.admin') and (SERVE_API_DOCS or app != 'drf_spectacular')
+]
+
+QUERY_INSPECTION = {**QUERY_INSPECTION, 'ENABLED': False}
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': [
+        renderer for renderer in REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES']
+        if renderer != 'rest_framework.renderers.BrowsableAPIRenderer'
+    ],
+}
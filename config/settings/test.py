@@ -0,0 +1,4 @@
+from .dev import *
+
+# A mirror of the default database, so the tests exercise the replica routing
+DATABASES.setdefault('replica_1', {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}})
@@ -14,23 +14,37 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
+from django.conf import settings
 from django.urls import path
 from django.urls import include
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
-from django.urls import path, re_path
-from rest_framework.permissions import AllowAny
 
 urlpatterns = [
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/auth/', include('apps.users.urls')),
     path('api/quiz/', include('apps.quiz.urls')),
-    #documentation urls
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
-    path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
 ]
+
+#documentation urls, only imported when this worker serves them
+if settings.SERVE_API_DOCS:
+    from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+
+    if settings.OPENAPI_SCHEMA_FILE.exists():
+        from utlis.schema import cached_schema_view
+        schema_view = cached_schema_view
+    else:
+        schema_view = SpectacularAPIView.as_view()
+
+    urlpatterns += [
+        path('api/schema/', schema_view, name='schema'),
+        path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
+    ]
+
+if settings.SERVE_ADMIN and 'django.contrib.admin' in settings.INSTALLED_APPS:
+    from django.contrib import admin
+
+    urlpatterns += [path('admin/', admin.site.urls)]
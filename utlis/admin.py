@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+
+class EstimatedCountPaginator(Paginator):
+    """Avoid unbounded COUNT(*) on large changelists.
+
+    Unfiltered Postgres tables use the planner's row estimate; filtered lists
+    count at most ADMIN_EXACT_COUNT_LIMIT rows.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        limit = settings.ADMIN_EXACT_COUNT_LIMIT
+        connection = connections[queryset.db]
+        if not queryset.query.where and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            if row and row[0] > limit:
+                return row[0]
+        return queryset.order_by()[:limit].count()
+
+
+class ScalableAdminMixin:
+    """Changelist defaults for million-row tables; tests hold each changelist to its query budget"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+    # The capped count (or Postgres estimate plus capped count) and the page itself
+    changelist_query_budget = 3
@@ -0,0 +1,144 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.exceptions import APIException
+
+from utlis.response import ResponseHandler
+
+
+class AdmissionRejected(APIException):
+    def __init__(self, detail, status_code, wait):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.wait = max(1, math.ceil(wait))
+
+
+class TokenBucket:
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now):
+        """Take one token, returns 0 on success or the seconds until one is available"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """In-process admission state for one endpoint class.
+
+    Keeps a global and per-user token bucket, an in-flight counter and a
+    latency moving average; every check is a few arithmetic operations under
+    one lock so it stays in the microsecond range.
+    """
+    LATENCY_SMOOTHING = 0.2
+    MAX_TRACKED_USERS = 100000
+
+    def __init__(self, global_rate=None, global_burst=None, user_rate=None, user_burst=None,
+                 max_concurrency=None, latency_threshold_ms=None, shed_retry_after=1):
+        now = time.monotonic()
+        self.global_bucket = TokenBucket(global_rate, global_burst or global_rate, now) if global_rate else None
+        self.user_rate = user_rate
+        self.user_burst = user_burst or user_rate
+        self.user_buckets = OrderedDict()
+        self.max_concurrency = max_concurrency
+        self.latency_threshold = latency_threshold_ms / 1000 if latency_threshold_ms else None
+        self.shed_retry_after = shed_retry_after
+        self.in_flight = 0
+        self.latency = 0.0
+        self.last_sample = 0.0
+        self._lock = threading.Lock()
+
+    def admit(self):
+        """Reserve a slot for a request before it is authenticated"""
+        now = time.monotonic()
+        with self._lock:
+            if self.max_concurrency and self.in_flight >= self.max_concurrency:
+                raise AdmissionRejected("Server is busy, please retry shortly", 503, self.shed_retry_after)
+            # Only trust the latency average while it is fresh, so shedding stops once traffic drains
+            if (self.latency_threshold and self.latency > self.latency_threshold
+                    and now - self.last_sample < self.shed_retry_after):
+                raise AdmissionRejected("Server is overloaded, please retry shortly", 503, self.shed_retry_after)
+            if self.global_bucket:
+                wait = self.global_bucket.take(now)
+                if wait:
+                    raise AdmissionRejected("Too many requests, please retry shortly", 429, wait)
+            self.in_flight += 1
+
+    def admit_user(self, user_id):
+        if not self.user_rate or user_id is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            bucket = self.user_buckets.get(user_id)
+            if bucket is None:
+                bucket = self.user_buckets[user_id] = TokenBucket(self.user_rate, self.user_burst, now)
+                if len(self.user_buckets) > self.MAX_TRACKED_USERS:
+                    self.user_buckets.popitem(last=False)
+            else:
+                self.user_buckets.move_to_end(user_id)
+            wait = bucket.take(now)
+        if wait:
+            raise AdmissionRejected("Too many requests, please slow down", 429, wait)
+
+    def release(self, elapsed):
+        with self._lock:
+            self.in_flight -= 1
+            self.latency += (elapsed - self.latency) * self.LATENCY_SMOOTHING
+            self.last_sample = time.monotonic()
+
+
+_controllers = {}
+_controllers_lock = threading.Lock()
+
+
+def get_controller(admission_class):
+    controller = _controllers.get(admission_class)
+    if controller is None:
+        with _controllers_lock:
+            controller = _controllers.get(admission_class)
+            if controller is None:
+                controller = AdmissionController(**settings.ADMISSION_CONTROL.get(admission_class, {}))
+                _controllers[admission_class] = controller
+    return controller
+
+
+class AdmissionControlMixin:
+    """Shed load for a view according to its ``admission_class`` in settings.ADMISSION_CONTROL.
+
+    Each endpoint class has its own limits, so a surge in one (e.g. admin
+    analytics) cannot starve another (e.g. login or grading).
+    """
+    admission_class = 'default'
+
+    def initial(self, request, *args, **kwargs):
+        controller = get_controller(self.admission_class)
+        controller.admit()
+        self._admission_started = time.monotonic()
+        super().initial(request, *args, **kwargs)
+        controller.admit_user(request.user.pk if request.user.is_authenticated else None)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, AdmissionRejected):
+            response = ResponseHandler.error(error=str(exc.detail), status=exc.status_code)
+            response['Retry-After'] = str(exc.wait)
+            return response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        started = getattr(self, '_admission_started', None)
+        if started is not None:
+            self._admission_started = None
+            get_controller(self.admission_class).release(time.monotonic() - started)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,64 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+_use_replica = ContextVar('use_replica', default=False)
+_wrote_to_primary = ContextVar('wrote_to_primary', default=False)
+
+
+def _pin_key(user_id):
+    return f"db:pin-primary:{user_id}"
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica')]
+
+
+class PrimaryReplicaRouter:
+    """Send reads to a replica only inside views that opted in, everything else to the primary"""
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get():
+            replicas = replica_aliases()
+            if replicas:
+                return random.choice(replicas)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _wrote_to_primary.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+class ReplicaPinningMiddleware:
+    """Pin a user's reads to the primary for a short while after any request of theirs wrote to it"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        wrote_token = _wrote_to_primary.set(False)
+        replica_token = _use_replica.set(False)
+        try:
+            response = self.get_response(request)
+            user = getattr(request, 'user', None)
+            if _wrote_to_primary.get() and user is not None and user.is_authenticated:
+                cache.set(_pin_key(user.pk), True, settings.REPLICA_PIN_SECONDS)
+            return response
+        finally:
+            _wrote_to_primary.reset(wrote_token)
+            _use_replica.reset(replica_token)
+
+
+class ReplicaReadMixin:
+    """Serve a read-only view from a replica unless the user recently wrote to the primary"""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in ('GET', 'HEAD', 'OPTIONS') and not cache.get(_pin_key(request.user.pk)):
+            _use_replica.set(True)
@@ -0,0 +1,131 @@
+import cProfile
+import io
+import json
+import pstats
+import re
+import time
+import uuid
+from contextlib import ExitStack
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db import connections
+
+TOKEN_SALT = 'request-profiling'
+PROFILE_ID_RE = re.compile(r'^[0-9]{20}-[0-9a-f]{8}$')
+
+
+def issue_token(user):
+    """A short-lived token that makes requests carrying it in the profiling header run under cProfile"""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(str(user.pk))
+
+
+def _valid_token(token):
+    """The token is unexpired and its holder is still an active admin"""
+    try:
+        user_id = signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=settings.PROFILING['TOKEN_MAX_AGE'])
+    except signing.BadSignature:
+        return False
+    return get_user_model().objects.filter(pk=user_id, is_active=True, role='ADMIN').exists()
+
+
+class SQLTimeline:
+    def __init__(self, started):
+        self.started = started
+        self.entries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        begin = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            end = time.perf_counter()
+            self.entries.append({
+                'alias': context['connection'].alias,
+                'offset_ms': round((begin - self.started) * 1000, 3),
+                'duration_ms': round((end - begin) * 1000, 3),
+                'sql': sql,
+            })
+
+
+def list_profiles():
+    directory = settings.PROFILING['DIR']
+    if not directory.exists():
+        return []
+    profiles = []
+    for path in sorted(directory.glob('*.json'), reverse=True):
+        with path.open() as handle:
+            meta = json.load(handle)
+        meta.pop('sql', None)
+        meta.pop('top_functions', None)
+        profiles.append(meta)
+    return profiles
+
+
+def profile_path(profile_id, suffix):
+    if not PROFILE_ID_RE.match(profile_id):
+        return None
+    path = settings.PROFILING['DIR'] / f"{profile_id}{suffix}"
+    return path if path.exists() else None
+
+
+def _save(request, response, profiler, timeline, elapsed):
+    directory = settings.PROFILING['DIR']
+    directory.mkdir(parents=True, exist_ok=True)
+    # Ids sort chronologically, which is what the ring eviction relies on
+    profile_id = f"{datetime.now().strftime('%Y%m%d%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+
+    profiler.dump_stats(directory / f"{profile_id}.prof")
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(30)
+    with (directory / f"{profile_id}.json").open('w') as handle:
+        json.dump({
+            'id': profile_id,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 3),
+            'query_count': len(timeline.entries),
+            'query_ms': round(sum(entry['duration_ms'] for entry in timeline.entries), 3),
+            'sql': timeline.entries,
+            'top_functions': summary.getvalue(),
+        }, handle)
+
+    # Keep only the newest RING_SIZE profiles on disk
+    stale = sorted(directory.glob('*.json'), reverse=True)[settings.PROFILING['RING_SIZE']:]
+    for path in stale:
+        path.unlink(missing_ok=True)
+        path.with_suffix('.prof').unlink(missing_ok=True)
+    return profile_id
+
+
+class RequestProfilingMiddleware:
+    """Profile a single request when it carries a valid signed token in the profiling header.
+
+    Requests without the header only pay for one dictionary lookup.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.meta_key = 'HTTP_' + settings.PROFILING['HEADER'].upper().replace('-', '_')
+
+    def __call__(self, request):
+        token = request.META.get(self.meta_key)
+        if token is None or not _valid_token(token):
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        timeline = SQLTimeline(started)
+        profiler = cProfile.Profile()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timeline))
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        response['X-Profile-Id'] = _save(request, response, profiler, timeline, time.perf_counter() - started)
+        return response
@@ -0,0 +1,118 @@
+import re
+import traceback
+import warnings
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\bIN \((?:\s*(?:%s|\?)\s*,?)+\)", re.IGNORECASE)
+_BATCH_INSERT = re.compile(r"^\s*INSERT\b.*\bVALUES\s*\([^()]*\)\s*,\s*\(", re.IGNORECASE | re.DOTALL)
+
+
+class NPlusOneDetected(AssertionError):
+    pass
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    """Reduce a statement to its shape so the same query with different parameters compares equal"""
+    return _IN_LISTS.sub('IN (...)', _LITERALS.sub('?', sql))
+
+
+def _project_stack():
+    """The caller's frames inside this project, skipping Django, DRF and this module"""
+    base_dir = str(settings.BASE_DIR)
+    return [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(base_dir) and 'site-packages' not in frame.filename
+        and frame.filename != __file__
+    ]
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.by_shape = defaultdict(list)
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        # Chunked bulk_create batches repeat by design; they still count against the budget
+        if not _BATCH_INSERT.match(sql):
+            self.by_shape[fingerprint(sql)].append(_project_stack())
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def recording(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+    def check(self, label, threshold, budget=None, mode='raise'):
+        """Raise or warn about repeated same-shape queries and a blown budget"""
+        problems = []
+        over_budget = budget is not None and self.count > budget
+        if over_budget:
+            problems.append(f"{label} ran {self.count} queries, budget is {budget}")
+        for shape, stacks in self.by_shape.items():
+            if len(stacks) >= threshold:
+                origin = ''.join(traceback.format_list(stacks[-1][-3:])) or '  (no project frames)\n'
+                problems.append(f"{len(stacks)}x same query in {label}:\n  {shape}\nissued from:\n{origin}")
+
+        if problems and mode == 'raise':
+            raise (QueryBudgetExceeded if over_budget else NPlusOneDetected)('\n'.join(problems))
+        for problem in problems:
+            warnings.warn(problem, stacklevel=3)
+
+
+@contextmanager
+def detect_queries(label='block', threshold=None, budget=None, mode='raise'):
+    """Record every query in the block and flag repeated same-shape queries or a blown budget.
+
+    Usable directly in tests::
+
+        with detect_queries(budget=4):
+            client.get('/api/quiz/my-submissions/')
+    """
+    recorder = QueryRecorder()
+    with recorder.recording():
+        yield recorder
+    recorder.check(label, threshold or settings.QUERY_INSPECTION['REPEAT_THRESHOLD'], budget, mode)
+
+
+class QueryInspectionMiddleware:
+    """Development middleware that runs every view under the same checks as detect_queries.
+
+    Views can declare ``query_budget``; the mode and repeat threshold come from
+    settings.QUERY_INSPECTION. Does nothing when inspection is disabled.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = settings.QUERY_INSPECTION
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        request._query_budget = getattr(view_class, 'query_budget', None)
+        request._query_label = f"{request.method} {request.path} ({getattr(view_class, '__name__', view_func.__name__)})"
+
+    def __call__(self, request):
+        if not self.config['ENABLED']:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        with recorder.recording():
+            response = self.get_response(request)
+        recorder.check(
+            getattr(request, '_query_label', f"{request.method} {request.path}"),
+            self.config['REPEAT_THRESHOLD'],
+            getattr(request, '_query_budget', None),
+            self.config['MODE'],
+        )
+        return response
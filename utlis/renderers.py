@@ -0,0 +1,21 @@
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Compact binary alternative to JSON, served when a client sends Accept: application/msgpack"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # Reuse DRF's JSON encoder for Decimal, datetime, UUID and lazy strings
+        return msgpack.packb(data, default=JSONEncoder().default, use_bin_type=True)
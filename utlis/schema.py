@@ -0,0 +1,28 @@
+import hashlib
+from functools import lru_cache
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_safe
+
+
+@lru_cache(maxsize=1)
+def _load_schema():
+    content = settings.OPENAPI_SCHEMA_FILE.read_bytes()
+    return content, f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+
+@require_safe
+def cached_schema_view(request):
+    """Serve the OpenAPI schema generated at build time instead of introspecting every view"""
+    content, etag = _load_schema()
+    # Weak comparison: compressed responses carry the ETag as W/"..."
+    if etag in {tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))}:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(content, content_type='application/vnd.oai.openapi+json')
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=300)
+    return response